@@ -10,31 +10,36 @@ và điều phối các thành phần khác nhau của hệ thống để xử l
 
 import asyncio
 import time
-from typing import Dict, Any, Optional, List
-
-from pydantic import BaseModel
+from typing import Dict, Any, Optional, List, AsyncIterator
 
 # Import các module khác
 from intent_analyzer import IntentAnalyzer
 from knowledge_manager import KnowledgeManager
-from response_generator import ResponseGenerator
+from response_generator import AgentResponse, ResponseGenerator
 from tool_manager import ToolManager
 from llm_orchestrator import LLMOrchestrator
 from utils.logging import setup_logger
-from config import AgentConfig
+from config import get_agent_config
 
 # Setup logging
 logger = setup_logger("agent_orchestrator")
 
 # Load configuration
-config = AgentConfig()
+config = get_agent_config()
+
+# Giữ reference đến các background task để tránh bị GC trước khi hoàn thành
+# (theo khuyến cáo trong asyncio docs về create_task)
+_background_tasks: set = set()
 
 
-class AgentResponse(BaseModel):
-    """Model cho response từ AI Agent."""
-    message: str
-    data: Optional[Dict[str, Any]] = None
-    type: str  # 'text', 'product', 'order', etc.
+def _log_background_failure(task: asyncio.Task) -> None:
+    """Ghi log lỗi của background task (fire-and-forget) nếu có."""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(
+            f"Background task failed: {task.exception()}",
+            exc_info=task.exception()
+        )
 
 
 class AgentOrchestrator:
@@ -55,7 +60,21 @@ class AgentOrchestrator:
         self.tool_manager = ToolManager()
         self.response_generator = ResponseGenerator()
         self.llm_orchestrator = LLMOrchestrator()
-        
+
+        # Dispatch tables: intent type -> handler. Tập intent là đóng (enum
+        # trong schema) nên dùng dict lookup thay cho if/elif chain — và một
+        # intent mới chỉ cần đăng ký đúng một chỗ cho mỗi bảng.
+        self._tool_dispatch = {
+            "product_search": self._plan_product_search,
+            "order_status": self._plan_order_status,
+            "customer_support": self._plan_customer_support,
+        }
+        self._response_dispatch = {
+            "product_search": self._respond_product_search,
+            "order_status": self._respond_order_status,
+            "customer_support": self._respond_customer_support,
+        }
+
         logger.info("Agent Orchestrator initialized")
     
     async def process_query(
@@ -101,13 +120,12 @@ class AgentOrchestrator:
             # Track execution time
             start_time = time.time()
             
-            # Step 1: Retrieve conversation history and context
-            conversation_history = await self.knowledge_manager.get_conversation_history(session_id)
-            
-            # Step 2: Analyze user intent
-            intent = await self.intent_analyzer.analyze(
-                message, 
-                conversation_history=conversation_history
+            # Step 1 + 2: Retrieve conversation history and analyze intent.
+            # Hai thao tác này độc lập (intent prompt không dùng history)
+            # nên chạy song song để không cộng dồn hai lượt I/O.
+            conversation_history, intent = await asyncio.gather(
+                self.knowledge_manager.get_conversation_history(session_id),
+                self.intent_analyzer.analyze(message)
             )
             
             logger.info(
@@ -119,20 +137,10 @@ class AgentOrchestrator:
                 }
             )
             
-            # Step 3: Execute tools based on intent
-            tool_results = {}
-            if intent.get("type") == "product_search":
-                keywords = intent.get("keywords", [])
-                tool_results["products"] = await self.tool_manager.search_products(keywords)
-                
-            elif intent.get("type") == "order_status":
-                order_id = intent.get("order_id")
-                tool_results["order"] = await self.tool_manager.get_order_info(order_id, user_id)
-                
-            elif intent.get("type") == "customer_support":
-                # For customer support, we may want to retrieve relevant knowledge
-                issue = intent.get("issue", "")
-                tool_results["support_info"] = await self.knowledge_manager.get_support_knowledge(issue)
+            # Step 3: Execute tools based on intent. Gom tất cả tool call
+            # áp dụng được rồi chạy song song — một intent có thể mang nhiều
+            # trường actionable (vd: product_search kèm order_id).
+            tool_results = await self._execute_tools(intent, user_id)
             
             # Step 4: Generate response based on intent and tool results
             response = await self.generate_response(
@@ -143,12 +151,17 @@ class AgentOrchestrator:
                 user_id=user_id
             )
             
-            # Step 5: Save conversation to history
-            await self.knowledge_manager.save_conversation(
-                session_id=session_id,
-                user_message=message,
-                agent_response=response
+            # Step 5: Save conversation to history (fire-and-forget —
+            # client không cần chờ ghi xong, lỗi chỉ cần log lại)
+            save_task = asyncio.create_task(
+                self.knowledge_manager.save_conversation(
+                    session_id=session_id,
+                    user_message=message,
+                    agent_response=response
+                )
             )
+            _background_tasks.add(save_task)
+            save_task.add_done_callback(_log_background_failure)
             
             # Log execution time
             execution_time = time.time() - start_time
@@ -176,6 +189,167 @@ class AgentOrchestrator:
                 type="text"
             )
     
+    async def process_query_stream(
+        self,
+        message: str,
+        session_id: str,
+        user_id: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        request_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Xử lý truy vấn và stream từng phần response về client.
+
+        Client nhận được nội dung ngay khi có thay vì chờ trọn vẹn
+        response + ghi lịch sử; việc lưu hội thoại chạy nền song song
+        với quá trình trả dữ liệu.
+
+        Parameters:
+        -----------
+        message : str
+            Tin nhắn từ người dùng
+        session_id : str
+            ID phiên làm việc
+        user_id : str, optional
+            ID của người dùng nếu đã xác thực
+        context : Dict[str, Any], optional
+            Context bổ sung
+        request_id : str, optional
+            ID của request để tracking
+
+        Yields:
+        -------
+        str
+            Các đoạn nội dung response theo thứ tự
+        """
+        try:
+            conversation_history, intent = await asyncio.gather(
+                self.knowledge_manager.get_conversation_history(session_id),
+                self.intent_analyzer.analyze(message)
+            )
+
+            tool_results = await self._execute_tools(intent, user_id)
+
+            # Stream nội dung về client, đồng thời gom lại để lưu lịch sử
+            accumulated: List[str] = []
+            async for chunk in self._stream_response(
+                message, intent, tool_results, conversation_history
+            ):
+                accumulated.append(chunk)
+                yield chunk
+
+            # Lưu hội thoại ở background, không chặn phần đuôi stream
+            response = AgentResponse(message="".join(accumulated), type="text")
+            save_task = asyncio.create_task(
+                self.knowledge_manager.save_conversation(
+                    session_id=session_id,
+                    user_message=message,
+                    agent_response=response
+                )
+            )
+            _background_tasks.add(save_task)
+            save_task.add_done_callback(_log_background_failure)
+
+        except Exception as e:
+            logger.error(
+                f"Error processing streamed query: {str(e)}",
+                extra={"session_id": session_id, "request_id": request_id},
+                exc_info=True
+            )
+            yield "Xin lỗi, tôi không thể xử lý yêu cầu của bạn lúc này. Vui lòng thử lại sau."
+
+    async def _stream_response(
+        self,
+        message: str,
+        intent: Dict[str, Any],
+        tool_results: Dict[str, Any],
+        conversation_history: List[Dict[str, Any]]
+    ) -> AsyncIterator[str]:
+        """
+        Sinh response dưới dạng stream các đoạn văn bản.
+
+        Các intent dùng tool (đã có sẵn dữ liệu) yield response thành một
+        đoạn duy nhất ngay khi format xong; các query general đi qua LLM
+        được stream theo từng token — client thấy chữ đầu tiên sau vài
+        trăm ms thay vì chờ cả completion.
+        """
+        if intent.get("type") in self._response_dispatch:
+            response = await self.generate_response(
+                message=message,
+                intent=intent,
+                tool_results=tool_results,
+                conversation_history=conversation_history
+            )
+            yield response.message
+            return
+
+        async for chunk in self.llm_orchestrator.generate_response_stream(
+            query=message,
+            conversation_history=conversation_history
+        ):
+            yield chunk
+
+    async def _execute_tools(
+        self,
+        intent: Dict[str, Any],
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Chạy song song tất cả tool call áp dụng được cho intent.
+
+        Parameters:
+        -----------
+        intent : Dict[str, Any]
+            Intent đã được phân tích
+        user_id : str, optional
+            ID của người dùng
+
+        Returns:
+        --------
+        Dict[str, Any]
+            Kết quả từ các tool, key theo tên kết quả
+        """
+        intent_type = intent.get("type")
+
+        planner = self._tool_dispatch.get(intent_type)
+        pending = planner(intent, user_id) if planner else []
+
+        # Intent kèm order_id ngoài nhánh order_status vẫn đáng tra cứu
+        if intent_type != "order_status" and intent.get("order_id"):
+            pending.append(("order", self.tool_manager.get_order_info(intent["order_id"], user_id)))
+
+        if not pending:
+            return {}
+
+        keys, coros = zip(*pending)
+        results = await asyncio.gather(*coros, return_exceptions=True)
+
+        tool_results = {}
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                # Một tool lỗi không được làm hỏng cả response
+                logger.error(f"Tool '{key}' failed: {str(result)}", exc_info=result)
+                tool_results[key] = {"error": str(result)}
+            else:
+                tool_results[key] = result
+
+        return tool_results
+
+    def _plan_product_search(self, intent: Dict[str, Any], user_id: Optional[str]) -> List[tuple]:
+        """Lên danh sách tool call cho intent product_search."""
+        keywords = intent.get("keywords", [])
+        return [("products", self.tool_manager.search_products(keywords))]
+
+    def _plan_order_status(self, intent: Dict[str, Any], user_id: Optional[str]) -> List[tuple]:
+        """Lên danh sách tool call cho intent order_status."""
+        order_id = intent.get("order_id")
+        return [("order", self.tool_manager.get_order_info(order_id, user_id))]
+
+    def _plan_customer_support(self, intent: Dict[str, Any], user_id: Optional[str]) -> List[tuple]:
+        """Lên danh sách tool call cho intent customer_support."""
+        issue = intent.get("issue", "")
+        return [("support_info", self.knowledge_manager.get_support_knowledge(issue))]
+
     async def generate_response(
         self,
         message: str,
@@ -205,40 +379,56 @@ class AgentOrchestrator:
         AgentResponse
             Phản hồi của agent
         """
-        intent_type = intent.get("type")
-        
-        if intent_type == "product_search":
-            # Format product search response
-            products = tool_results.get("products", {})
-            return self.response_generator.format_product_response(
-                products=products, 
-                keywords=intent.get("keywords", [])
-            )
-            
-        elif intent_type == "order_status":
-            # Format order status response
-            order_info = tool_results.get("order", {})
-            return self.response_generator.format_order_response(order_info)
-            
-        elif intent_type == "customer_support":
-            # Generate support response using LLM
-            support_info = tool_results.get("support_info", {})
-            support_response = await self.llm_orchestrator.generate_support_response(
-                query=message,
-                support_info=support_info
-            )
-            return AgentResponse(
-                message=support_response,
-                type="text"
-            )
-            
-        else:
-            # General queries - use LLM to generate response
-            llm_response = await self.llm_orchestrator.generate_response(
-                query=message,
-                conversation_history=conversation_history
-            )
-            return AgentResponse(
-                message=llm_response,
-                type="text"
-            )
\ No newline at end of file
+        handler = self._response_dispatch.get(intent.get("type"))
+        if handler:
+            return await handler(message, intent, tool_results)
+
+        # General queries - use LLM to generate response
+        llm_response = await self.llm_orchestrator.generate_response(
+            query=message,
+            conversation_history=conversation_history
+        )
+        return AgentResponse(
+            message=llm_response,
+            type="text"
+        )
+
+    async def _respond_product_search(
+        self,
+        message: str,
+        intent: Dict[str, Any],
+        tool_results: Dict[str, Any]
+    ) -> AgentResponse:
+        """Định dạng response cho intent product_search."""
+        products = tool_results.get("products", {})
+        return self.response_generator.format_product_response(
+            products=products,
+            keywords=intent.get("keywords", [])
+        )
+
+    async def _respond_order_status(
+        self,
+        message: str,
+        intent: Dict[str, Any],
+        tool_results: Dict[str, Any]
+    ) -> AgentResponse:
+        """Định dạng response cho intent order_status."""
+        order_info = tool_results.get("order", {})
+        return self.response_generator.format_order_response(order_info)
+
+    async def _respond_customer_support(
+        self,
+        message: str,
+        intent: Dict[str, Any],
+        tool_results: Dict[str, Any]
+    ) -> AgentResponse:
+        """Tạo response hỗ trợ khách hàng qua LLM."""
+        support_info = tool_results.get("support_info", {})
+        support_response = await self.llm_orchestrator.generate_support_response(
+            query=message,
+            support_info=support_info
+        )
+        return AgentResponse(
+            message=support_response,
+            type="text"
+        )
\ No newline at end of file
@@ -10,19 +10,25 @@ xử lý CORS, authentication, request validation, rate limiting và routing.
 
 import os
 import time
-import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import asdict, is_dataclass
 from typing import Dict, Any, Optional
 
 from fastapi import FastAPI, Request, HTTPException, Depends, Header, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from starlette.middleware.base import BaseHTTPMiddleware
 
+import redis.asyncio as redis
+from ulid import ULID
+
 # Import các module khác
 from agent_orchestrator import AgentOrchestrator
-from config import APIConfig
+from config import get_api_config, get_cache_config
 from utils.logging import setup_logger
+from utils.redis_pool import get_pool, disconnect_pools
 from utils.security import verify_api_key, get_current_user
 
 
@@ -30,13 +36,35 @@ from utils.security import verify_api_key, get_current_user
 logger = setup_logger("api_gateway")
 
 # Load configuration
-config = APIConfig()
+config = get_api_config()
+cache_config = get_cache_config()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Quản lý tài nguyên dùng chung theo vòng đời app."""
+    # Làm nóng L1 intent cache từ Redis để tránh cold-start miss; bound bằng
+    # timeout để không giữ chân app startup khi Redis chậm
+    try:
+        await asyncio.wait_for(
+            agent_orchestrator.intent_analyzer.warm_l1_cache(), timeout=10
+        )
+    except Exception as e:
+        logger.error(f"Intent cache warmup skipped: {str(e)}")
+
+    yield
+    # Đóng HTTP session và các Redis pool dùng chung khi app shutdown
+    await agent_orchestrator.tool_manager.close()
+    await disconnect_pools()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Mega Market AI Agent API",
     description="Backend API for Mega Market AI Assistant",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -51,37 +79,40 @@ app.add_middleware(
 
 # Rate limiting middleware
 class RateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    Rate limiting dựa trên Redis INCR + EXPIRE theo cửa sổ mỗi phút.
+
+    Counter nằm trong Redis nên chính xác khi chạy nhiều uvicorn worker,
+    tự hết hạn theo TTL và không tích lũy state trong process.
+    """
+
     def __init__(self, app, rate_limit_per_minute=60):
         super().__init__(app)
         self.rate_limit = rate_limit_per_minute
-        self.clients = {}
-    
+        self.redis = redis.Redis(
+            connection_pool=get_pool(cache_config.REDIS_RATELIMIT_DB)
+        )
+
     async def dispatch(self, request: Request, call_next):
         client_ip = request.client.host
-        current_time = time.time()
-        
-        # Clean up old entries
-        self.clients = {ip: data for ip, data in self.clients.items() 
-                        if current_time - data["last_request"] < 60}
-        
-        if client_ip in self.clients:
-            client_data = self.clients[client_ip]
-            if current_time - client_data["last_request"] < 60:
-                if client_data["requests"] >= self.rate_limit:
-                    return JSONResponse(
-                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                        content={"detail": "Too many requests"}
-                    )
-                client_data["requests"] += 1
-            else:
-                client_data["requests"] = 1
-            client_data["last_request"] = current_time
-        else:
-            self.clients[client_ip] = {
-                "requests": 1,
-                "last_request": current_time
-            }
-        
+        window = int(time.time() // 60)
+        key = f"rl:{client_ip}:{window}"
+
+        try:
+            pipe = self.redis.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, 60, nx=True)
+            count, _ = await pipe.execute()
+
+            if count > self.rate_limit:
+                return JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"detail": "Too many requests"}
+                )
+        except Exception as e:
+            # Fail open: không chặn request khi Redis gặp sự cố
+            logger.error(f"Rate limit check failed: {str(e)}")
+
         response = await call_next(request)
         return response
 
@@ -118,6 +149,24 @@ class AgentResponse(BaseModel):
 agent_orchestrator = AgentOrchestrator()
 
 
+def _serialize_agent_response(response) -> Dict[str, Any]:
+    """
+    Chuyển response của orchestrator thành dict cho ORJSONResponse.
+
+    Orchestrator và các formatter đều trả về dataclass; nhánh model_dump
+    giữ lại để tương thích nếu có handler nào còn trả pydantic model.
+    """
+    if is_dataclass(response):
+        payload = asdict(response)
+    else:
+        payload = response.model_dump()
+
+    if payload.get("data") is None:
+        payload.pop("data", None)
+
+    return payload
+
+
 @app.get("/health", response_model=HealthCheckResponse)
 async def health_check():
     """Health check endpoint."""
@@ -128,21 +177,22 @@ async def health_check():
     }
 
 
-@app.post("/chat", response_model=AgentResponse)
+@app.post("/chat")
 async def chat_endpoint(
     query: UserQuery,
     request: Request,
     x_api_key: Optional[str] = Header(None)
-):
+) -> ORJSONResponse:
     """
     Endpoint chính để xử lý các chat request.
-    
+
     Parameters:
     - query: UserQuery object
     - x_api_key: Optional API key for authentication
-    
+
     Returns:
-    - AgentResponse object
+    - AgentResponse được serialize trực tiếp qua orjson (response đã được
+      orchestrator build từ model hợp lệ nên không cần Pydantic validate lại)
     """
     try:
         # Validate API key if required
@@ -153,8 +203,9 @@ async def chat_endpoint(
                     detail="Invalid or missing API key"
                 )
         
-        # Generate request ID for tracking
-        request_id = str(uuid.uuid4())
+        # Generate request ID for tracking (ULID: time-ordered, không tốn
+        # syscall urandom riêng cho từng ID như uuid4)
+        request_id = str(ULID())
         
         # Log the incoming request
         client_ip = request.client.host
@@ -162,7 +213,7 @@ async def chat_endpoint(
                    extra={"request_id": request_id, "client_ip": client_ip})
         
         # Get or generate session ID
-        session_id = query.session_id or str(uuid.uuid4())
+        session_id = query.session_id or str(ULID())
         
         # Process query through orchestrator
         start_time = time.time()
@@ -178,8 +229,9 @@ async def chat_endpoint(
         processing_time = time.time() - start_time
         logger.info(f"Request {request_id} processed in {processing_time:.2f}s",
                    extra={"request_id": request_id, "processing_time": processing_time})
-        
-        return response
+
+        # Serialize một lần duy nhất, bỏ qua vòng re-validate của FastAPI
+        return ORJSONResponse(content=_serialize_agent_response(response))
         
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}", exc_info=True)
@@ -189,6 +241,52 @@ async def chat_endpoint(
         )
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(
+    query: UserQuery,
+    request: Request,
+    x_api_key: Optional[str] = Header(None)
+) -> StreamingResponse:
+    """
+    Endpoint stream response về client theo từng đoạn.
+
+    Client thấy nội dung ngay khi agent có, và việc ghi lịch sử hội thoại
+    chạy nền thay vì chặn response.
+
+    Parameters:
+    - query: UserQuery object
+    - x_api_key: Optional API key for authentication
+
+    Returns:
+    - StreamingResponse (text/plain) gồm các đoạn nội dung
+    """
+    # Validate API key if required
+    if config.REQUIRE_API_KEY:
+        if not x_api_key or not verify_api_key(x_api_key):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or missing API key"
+            )
+
+    request_id = str(ULID())
+    session_id = query.session_id or str(ULID())
+
+    client_ip = request.client.host
+    logger.info(f"Stream request {request_id} received from {client_ip}",
+               extra={"request_id": request_id, "client_ip": client_ip})
+
+    return StreamingResponse(
+        agent_orchestrator.process_query_stream(
+            query.message,
+            session_id=session_id,
+            user_id=query.user_id,
+            context=query.context,
+            request_id=request_id
+        ),
+        media_type="text/plain; charset=utf-8"
+    )
+
+
 @app.post("/feedback")
 async def feedback_endpoint(
     feedback_data: Dict[str, Any],
@@ -227,5 +325,11 @@ if __name__ == "__main__":
         "api_gateway:app",
         host=config.HOST,
         port=config.PORT,
-        reload=config.DEBUG
+        reload=config.DEBUG,
+        # uvloop + httptools: event loop và HTTP parser bằng C thay cho bản
+        # pure-Python của asyncio — giảm overhead mỗi I/O cho workload này
+        loop="uvloop",
+        http="httptools",
+        # reload và multi-worker loại trừ nhau trong uvicorn
+        workers=None if config.DEBUG else config.WORKERS
     )
\ No newline at end of file
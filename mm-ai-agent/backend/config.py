@@ -9,6 +9,8 @@ khác nhau trong hệ thống, được tải từ biến môi trường hoặc
 """
 
 import os
+import hashlib
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
@@ -18,7 +20,10 @@ load_dotenv()
 
 class APIConfig:
     """Configuration cho API Gateway."""
-    
+
+    __slots__ = ("HOST", "PORT", "DEBUG", "VERSION", "WORKERS", "REQUIRE_API_KEY",
+                 "API_KEYS", "API_KEY_HASHES", "CORS_ORIGINS", "RATE_LIMIT")
+
     def __init__(self):
         """Load configuration từ biến môi trường."""
         # Server settings
@@ -26,10 +31,16 @@ class APIConfig:
         self.PORT = int(os.getenv("API_PORT", "5000"))
         self.DEBUG = os.getenv("DEBUG", "False").lower() == "true"
         self.VERSION = os.getenv("API_VERSION", "1.0.0")
+        self.WORKERS = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
         
         # Security settings
         self.REQUIRE_API_KEY = os.getenv("REQUIRE_API_KEY", "False").lower() == "true"
         self.API_KEYS = os.getenv("API_KEYS", "").split(",")
+        # SHA-256 digest của từng key, tính một lần lúc load: lookup O(1)
+        # và không so sánh trực tiếp raw secret trên mỗi request
+        self.API_KEY_HASHES = frozenset(
+            hashlib.sha256(key.encode()).digest() for key in self.API_KEYS if key
+        )
         
         # CORS settings
         self.CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -40,7 +51,9 @@ class APIConfig:
 
 class AgentConfig:
     """Configuration cho Agent Orchestrator."""
-    
+
+    __slots__ = ("MAX_CONVERSATION_TURNS", "DEFAULT_LANGUAGE", "TOOL_TIMEOUT", "LLM_TIMEOUT")
+
     def __init__(self):
         """Load configuration từ biến môi trường."""
         # Agent settings
@@ -54,7 +67,13 @@ class AgentConfig:
 
 class LLMConfig:
     """Configuration cho LLM Orchestrator và các LLM Providers."""
-    
+
+    __slots__ = ("DEFAULT_PROVIDER", "ENABLED_PROVIDERS", "OPENAI_API_KEY", "OPENAI_MODEL",
+                 "OPENAI_TEMPERATURE", "ANTHROPIC_API_KEY", "ANTHROPIC_MODEL",
+                 "ANTHROPIC_TEMPERATURE", "GOOGLE_API_KEY", "GOOGLE_MODEL",
+                 "GOOGLE_TEMPERATURE", "INTENT_BATCH_MAX_SIZE", "INTENT_BATCH_MAX_WAIT_MS",
+                 "LLM_BREAKER_FAIL_MAX", "LLM_BREAKER_RESET_TIMEOUT", "LLM_CACHE_TTL")
+
     def __init__(self):
         """Load configuration từ biến môi trường."""
         # Default provider
@@ -82,21 +101,43 @@ class LLMConfig:
         self.GOOGLE_MODEL = os.getenv("GOOGLE_MODEL", "gemini-pro")
         self.GOOGLE_TEMPERATURE = float(os.getenv("GOOGLE_TEMPERATURE", "0.3"))
 
+        # Intent analysis micro-batching
+        self.INTENT_BATCH_MAX_SIZE = int(os.getenv("INTENT_BATCH_MAX_SIZE", "8"))
+        self.INTENT_BATCH_MAX_WAIT_MS = int(os.getenv("INTENT_BATCH_MAX_WAIT_MS", "30"))
+
+        # Circuit breaker cho LLM provider calls
+        self.LLM_BREAKER_FAIL_MAX = int(os.getenv("LLM_BREAKER_FAIL_MAX", "5"))
+        self.LLM_BREAKER_RESET_TIMEOUT = float(os.getenv("LLM_BREAKER_RESET_TIMEOUT", "30"))
+
+        # LLM response cache (cho các call đánh dấu cacheable)
+        self.LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "300"))  # 5 minutes
+
 
 class CacheConfig:
     """Configuration cho Redis và các cache khác."""
-    
+
+    __slots__ = ("REDIS_HOST", "REDIS_PORT", "REDIS_PASSWORD", "REDIS_MAX_CONNECTIONS",
+                 "REDIS_INTENT_DB", "REDIS_TOOL_DB", "REDIS_KNOWLEDGE_DB", "REDIS_RATELIMIT_DB",
+                 "REDIS_LLM_DB",
+                 "INTENT_CACHE_TTL", "PRODUCT_CACHE_TTL", "ORDER_CACHE_TTL",
+                 "CUSTOMER_CACHE_TTL", "CDP_CACHE_TTL", "SUPPORT_CACHE_TTL",
+                 "CATEGORY_CACHE_TTL", "CONVERSATION_TTL", "INTERACTION_TTL",
+                 "INTENT_L1_MAXSIZE", "INTENT_L1_TTL")
+
     def __init__(self):
         """Load configuration từ biến môi trường."""
         # Redis connection
         self.REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
         self.REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
         self.REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", "")
+        self.REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
         
         # Redis databases
         self.REDIS_INTENT_DB = int(os.getenv("REDIS_INTENT_DB", "0"))
         self.REDIS_TOOL_DB = int(os.getenv("REDIS_TOOL_DB", "1"))
         self.REDIS_KNOWLEDGE_DB = int(os.getenv("REDIS_KNOWLEDGE_DB", "2"))
+        self.REDIS_RATELIMIT_DB = int(os.getenv("REDIS_RATELIMIT_DB", "3"))
+        self.REDIS_LLM_DB = int(os.getenv("REDIS_LLM_DB", "4"))
         
         # Cache TTL (time-to-live) in seconds
         self.INTENT_CACHE_TTL = int(os.getenv("INTENT_CACHE_TTL", "3600"))  # 1 hour
@@ -107,11 +148,19 @@ class CacheConfig:
         self.SUPPORT_CACHE_TTL = int(os.getenv("SUPPORT_CACHE_TTL", "86400"))  # 24 hours
         self.CATEGORY_CACHE_TTL = int(os.getenv("CATEGORY_CACHE_TTL", "86400"))  # 24 hours
         self.CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "86400"))  # 24 hours
+        self.INTERACTION_TTL = int(os.getenv("INTERACTION_TTL", "604800"))  # 7 days
+
+        # In-process L1 cache (per worker) in front of Redis
+        self.INTENT_L1_MAXSIZE = int(os.getenv("INTENT_L1_MAXSIZE", "10000"))
+        self.INTENT_L1_TTL = int(os.getenv("INTENT_L1_TTL", "300"))  # 5 minutes
 
 
 class ToolsConfig:
     """Configuration cho Tool Manager và các API connections."""
-    
+
+    __slots__ = ("SEARCH_API_URL", "ORDER_API_URL", "CUSTOMER_API_URL", "CDP_API_URL",
+                 "API_TOKEN", "STORE_CODE", "CDP_API_KEY")
+
     def __init__(self):
         """Load configuration từ biến môi trường."""
         # API URLs
@@ -128,11 +177,52 @@ class ToolsConfig:
 
 class KnowledgeConfig:
     """Configuration cho Knowledge Manager."""
-    
+
+    __slots__ = ("MAX_HISTORY_MESSAGES", "EMBEDDING_MODEL")
+
     def __init__(self):
         """Load configuration từ biến môi trường."""
         # Conversation history
         self.MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "20"))
         
         # Embedding model (nếu dùng vector search)
-        self.EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
\ No newline at end of file
+        self.EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+
+
+# Singleton accessors: mỗi config chỉ parse env đúng một lần cho cả process,
+# các module dùng chung một instance thay vì tự tạo bản riêng.
+
+@lru_cache(maxsize=1)
+def get_api_config() -> APIConfig:
+    """Trả về instance APIConfig dùng chung."""
+    return APIConfig()
+
+
+@lru_cache(maxsize=1)
+def get_agent_config() -> AgentConfig:
+    """Trả về instance AgentConfig dùng chung."""
+    return AgentConfig()
+
+
+@lru_cache(maxsize=1)
+def get_llm_config() -> LLMConfig:
+    """Trả về instance LLMConfig dùng chung."""
+    return LLMConfig()
+
+
+@lru_cache(maxsize=1)
+def get_cache_config() -> CacheConfig:
+    """Trả về instance CacheConfig dùng chung."""
+    return CacheConfig()
+
+
+@lru_cache(maxsize=1)
+def get_tools_config() -> ToolsConfig:
+    """Trả về instance ToolsConfig dùng chung."""
+    return ToolsConfig()
+
+
+@lru_cache(maxsize=1)
+def get_knowledge_config() -> KnowledgeConfig:
+    """Trả về instance KnowledgeConfig dùng chung."""
+    return KnowledgeConfig()
\ No newline at end of file
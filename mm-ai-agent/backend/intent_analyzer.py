@@ -8,22 +8,47 @@ Module này chịu trách nhiệm phân tích ý định (intent) của người
 và phân loại thành các loại intent khác nhau như product_search, order_status, etc.
 """
 
-import json
-import hashlib
-from typing import Dict, Any, List, Optional
+import re
+import asyncio
+import unicodedata
+from typing import Dict, Any, List, Optional, Tuple
 
+import xxhash
+import msgpack
 import redis.asyncio as redis
+from cachetools import TTLCache
 
 from llm_orchestrator import LLMOrchestrator
 from utils.logging import setup_logger
-from config import CacheConfig, LLMConfig
+from utils.redis_pool import get_pool
+from config import get_cache_config, get_llm_config
 
 # Setup logging
 logger = setup_logger("intent_analyzer")
 
 # Load configuration
-cache_config = CacheConfig()
-llm_config = LLMConfig()
+cache_config = get_cache_config()
+llm_config = get_llm_config()
+
+# Precompiled whitespace collapser for cache-key normalization
+_WS_RE = re.compile(r"\s+")
+
+# Từ vựng danh mục sản phẩm cho pre-classifier: message khớp rõ ràng với
+# vocabulary này được phân loại product_search ngay, không cần LLM call.
+# Lưu dạng token đã casefold; cụm 2 từ được match qua bigram.
+_PRODUCT_VOCAB = frozenset({
+    "tivi", "tv", "laptop", "điện thoại", "máy tính", "tủ lạnh", "máy giặt",
+    "máy lạnh", "điều hòa", "quạt", "nồi cơm", "bếp", "lò vi sóng", "lò nướng",
+    "máy xay", "ấm đun", "bàn ủi", "bàn là", "máy hút bụi", "máy lọc nước",
+    "sữa", "gạo", "mì", "dầu ăn", "nước mắm", "nước ngọt", "bia", "bánh",
+    "kẹo", "trái cây", "rau", "thịt", "cá", "trứng", "gia vị", "đường",
+    "quần áo", "giày", "dép", "balo", "túi xách", "khăn", "chăn", "gối", "nệm",
+    "dầu gội", "sữa tắm", "kem đánh răng", "bột giặt", "nước rửa chén",
+    "giấy vệ sinh", "tã", "bỉm", "đồ chơi",
+})
+
+# Tỷ lệ token khớp vocabulary tối thiểu để tin tưởng bỏ qua LLM
+_FAST_MATCH_THRESHOLD = 0.5
 
 
 class IntentAnalyzer:
@@ -33,19 +58,91 @@ class IntentAnalyzer:
     Sử dụng LLM để phân tích intent và cache kết quả
     để tăng hiệu suất hệ thống.
     """
-    
-    def __init__(self):
-        """Khởi tạo Intent Analyzer."""
+
+    # Schema và khung prompt không đổi giữa các request — build một lần ở
+    # class scope thay vì cấp phát lại hàng chục dict/string mỗi lời gọi.
+    _INTENT_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "type": {
+                "type": "string",
+                "enum": ["product_search", "order_status", "customer_support", "general"]
+            },
+            "keywords": {
+                "type": "array",
+                "items": {"type": "string"}
+            },
+            "order_id": {"type": "string"},
+            "issue": {"type": "string"},
+            "query": {"type": "string"}
+        },
+        "required": ["type"]
+    }
+
+    _BATCH_INTENT_SCHEMA = {
+        "type": "array",
+        "items": _INTENT_SCHEMA
+    }
+
+    _INTENT_FORMAT_GUIDE = """
+        1. Nếu người dùng đang tìm sản phẩm:
+        {
+            "type": "product_search",
+            "keywords": ["từ khóa 1", "từ khóa 2", ...]
+        }
+
+        2. Nếu người dùng đang hỏi về trạng thái đơn hàng:
+        {
+            "type": "order_status",
+            "order_id": "mã đơn hàng nếu có"
+        }
+
+        3. Nếu người dùng cần hỗ trợ khách hàng:
+        {
+            "type": "customer_support",
+            "issue": "vấn đề cần hỗ trợ"
+        }
+
+        4. Nếu là câu hỏi khác:
+        {
+            "type": "general",
+            "query": "nội dung câu hỏi"
+        }
+        """
+
+    def __init__(self, redis_pool: Optional[redis.ConnectionPool] = None):
+        """
+        Khởi tạo Intent Analyzer.
+
+        Parameters:
+        -----------
+        redis_pool : redis.ConnectionPool, optional
+            Connection pool dùng chung; mặc định lấy pool process-wide
+        """
         self.llm_orchestrator = LLMOrchestrator()
-        
-        # Setup Redis connection
+
+        # Setup Redis connection (binary-safe: intent cache lưu msgpack bytes)
         self.redis = redis.Redis(
-            host=cache_config.REDIS_HOST,
-            port=cache_config.REDIS_PORT,
-            db=cache_config.REDIS_INTENT_DB,
-            decode_responses=True
+            connection_pool=redis_pool or get_pool(
+                cache_config.REDIS_INTENT_DB, decode_responses=False
+            )
         )
-        
+
+        # L1 cache trong process: tránh cả round-trip Redis lẫn msgpack decode
+        # cho các message lặp lại nhiều ("hi", "trạng thái đơn hàng", ...).
+        # Mỗi uvicorn worker có L1 riêng; Redis vẫn là source of truth.
+        self._l1_cache = TTLCache(
+            maxsize=cache_config.INTENT_L1_MAXSIZE,
+            ttl=cache_config.INTENT_L1_TTL
+        )
+
+        # Micro-batching: gom các lời gọi analyze() đồng thời thành một LLM call
+        # duy nhất để tránh chạm giới hạn RPM của provider dưới tải cao.
+        self.batch_max_size = llm_config.INTENT_BATCH_MAX_SIZE
+        self.batch_max_wait = llm_config.INTENT_BATCH_MAX_WAIT_MS / 1000.0
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_worker_task: Optional[asyncio.Task] = None
+
         logger.info("Intent Analyzer initialized")
     
     async def analyze(
@@ -70,20 +167,273 @@ class IntentAnalyzer:
         """
         # Generate cache key
         cache_key = self._generate_cache_key(message)
-        
-        # Try to get from cache first
+
+        # L1: in-process cache, không tốn round-trip nào
+        cached_intent = self._l1_cache.get(cache_key)
+        if cached_intent:
+            logger.info(f"Intent found in L1 cache: {cached_intent.get('type')}")
+            return cached_intent
+
+        # L2: Redis cache
         cached_intent = await self._get_from_cache(cache_key)
         if cached_intent:
             logger.info(f"Intent found in cache: {cached_intent.get('type')}")
+            self._l1_cache[cache_key] = cached_intent
             return cached_intent
-            
-        # If not in cache, use LLM to analyze
-        intent = await self._analyze_with_llm(message, conversation_history)
-        
+
+        # Pre-classifier: message khớp rõ vocabulary sản phẩm thì khỏi gọi LLM
+        intent = self._fast_classify(message)
+        if intent:
+            logger.info("Intent fast-classified as product_search")
+        else:
+            # If not in cache, enqueue for (micro-batched) LLM analysis
+            intent = await self._enqueue_for_analysis(message)
+
         # Cache the result
+        self._l1_cache[cache_key] = intent
         await self._cache_intent(cache_key, intent)
-        
+
         return intent
+
+    async def warm_l1_cache(self, max_entries: int = 5000, batch_size: int = 500) -> int:
+        """
+        Làm nóng L1 cache từ Redis khi khởi động.
+
+        Quét các key intent hiện có trong Redis và nạp trước vào L1 theo
+        từng batch MGET, để các truy vấn đầu tiên sau cold start không phải
+        trả giá cache miss.
+
+        Parameters:
+        -----------
+        max_entries : int
+            Số entry tối đa được nạp (giới hạn memory)
+        batch_size : int
+            Số key mỗi lượt MGET
+
+        Returns:
+        --------
+        int
+            Số entry đã nạp vào L1
+        """
+        loaded = 0
+        batch: List[bytes] = []
+
+        try:
+            async for key in self.redis.scan_iter(match="intent:*", count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    loaded += await self._load_l1_batch(batch)
+                    batch = []
+                if loaded >= max_entries:
+                    break
+
+            if batch and loaded < max_entries:
+                loaded += await self._load_l1_batch(batch)
+
+        except Exception as e:
+            logger.error(f"Error warming intent L1 cache: {str(e)}")
+
+        logger.info(f"Warmed intent L1 cache with {loaded} entries")
+        return loaded
+
+    async def _load_l1_batch(self, keys: List[bytes]) -> int:
+        """Nạp một batch key từ Redis vào L1 qua MGET, trả về số entry nạp được."""
+        loaded = 0
+        values = await self.redis.mget(keys)
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            try:
+                cache_key = key.decode() if isinstance(key, bytes) else key
+                self._l1_cache[cache_key] = msgpack.unpackb(value, raw=False)
+                loaded += 1
+            except Exception:
+                # Entry định dạng cũ/hỏng: bỏ qua, sẽ được ghi đè khi dùng
+                continue
+        return loaded
+
+    def _fast_classify(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Pre-classifier không cần LLM cho các truy vấn tìm sản phẩm hiển nhiên.
+
+        Quét token (kèm bigram cho cụm 2 từ) của message đã chuẩn hóa so với
+        vocabulary danh mục sản phẩm. Nếu phần lớn message khớp vocabulary thì
+        coi như product_search với độ tin cậy cao — tiết kiệm nguyên một LLM
+        round-trip cho nhóm truy vấn phổ biến nhất của chatbot bán lẻ.
+
+        Parameters:
+        -----------
+        message : str
+            Tin nhắn từ người dùng
+
+        Returns:
+        --------
+        Dict[str, Any] or None
+            Intent product_search nếu đủ tự tin, None nếu cần LLM
+        """
+        normalized = _WS_RE.sub(
+            " ", unicodedata.normalize("NFKC", message).casefold().strip()
+        )
+        tokens = normalized.split(" ") if normalized else []
+        if not tokens:
+            return None
+
+        matched: List[str] = []
+        covered = 0
+        i = 0
+        while i < len(tokens):
+            bigram = f"{tokens[i]} {tokens[i + 1]}" if i + 1 < len(tokens) else None
+            if bigram and bigram in _PRODUCT_VOCAB:
+                matched.append(bigram)
+                covered += 2
+                i += 2
+            elif tokens[i] in _PRODUCT_VOCAB:
+                matched.append(tokens[i])
+                covered += 1
+                i += 1
+            else:
+                i += 1
+
+        if matched and covered / len(tokens) >= _FAST_MATCH_THRESHOLD:
+            return {"type": "product_search", "keywords": matched}
+
+        return None
+
+    async def _enqueue_for_analysis(self, message: str) -> Dict[str, Any]:
+        """
+        Đưa message vào hàng đợi batch và chờ kết quả phân tích.
+
+        Các lời gọi đến trong cùng một cửa sổ thời gian ngắn sẽ được gom lại
+        và phân tích chung trong một LLM call duy nhất.
+
+        Parameters:
+        -----------
+        message : str
+            Tin nhắn từ người dùng
+
+        Returns:
+        --------
+        Dict[str, Any]
+            Intent được phân tích
+        """
+        self._ensure_batch_worker()
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((message, future))
+        return await future
+
+    def _ensure_batch_worker(self) -> None:
+        """Khởi tạo queue và background worker (lazy, theo event loop hiện tại)."""
+        if self._batch_worker_task is None or self._batch_worker_task.done():
+            self._batch_queue = asyncio.Queue()
+            self._batch_worker_task = asyncio.create_task(self._batch_worker())
+
+    async def _batch_worker(self) -> None:
+        """
+        Background worker gom các request phân tích intent thành batch.
+
+        Worker chờ request đầu tiên, sau đó gom thêm request trong tối đa
+        batch_max_wait giây hoặc đến khi đủ batch_max_size request, rồi gửi
+        cả batch trong một LLM call duy nhất.
+        """
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._batch_queue.get()]
+
+            # Gom thêm request đang chờ trong cửa sổ thời gian cho phép
+            deadline = asyncio.get_running_loop().time() + self.batch_max_wait
+            while len(batch) < self.batch_max_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._batch_queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._process_batch(batch)
+
+    async def _process_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """
+        Phân tích một batch message và trả kết quả về các future tương ứng.
+
+        Parameters:
+        -----------
+        batch : List[Tuple[str, asyncio.Future]]
+            Danh sách (message, future) cần xử lý
+        """
+        # Batch chỉ có một message thì đi đường phân tích đơn như cũ
+        if len(batch) == 1:
+            message, future = batch[0]
+            intent = await self._analyze_with_llm(message)
+            if not future.done():
+                future.set_result(intent)
+            return
+
+        messages = [message for message, _ in batch]
+        intents = await self._analyze_batch_with_llm(messages)
+
+        for (message, future), intent in zip(batch, intents):
+            if not future.done():
+                future.set_result(intent)
+
+    async def _analyze_batch_with_llm(self, messages: List[str]) -> List[Dict[str, Any]]:
+        """
+        Sử dụng một LLM call duy nhất để phân tích intent cho nhiều message.
+
+        Parameters:
+        -----------
+        messages : List[str]
+            Danh sách tin nhắn cần phân tích
+
+        Returns:
+        --------
+        List[Dict[str, Any]]
+            Danh sách intent tương ứng theo thứ tự message
+        """
+        prompt = self._construct_batch_intent_prompt(messages)
+
+        try:
+            response = await self.llm_orchestrator.generate_structured_response(
+                prompt=prompt,
+                output_schema=self._BATCH_INTENT_SCHEMA
+            )
+
+            if isinstance(response, list) and len(response) == len(messages):
+                return response
+
+            logger.error(f"Batch intent response malformed, expected {len(messages)} items")
+
+        except Exception as e:
+            logger.error(f"Error analyzing intent batch with LLM: {str(e)}")
+
+        # Default to general intent for the whole batch on error
+        return [{"type": "general", "query": message} for message in messages]
+
+    def _construct_batch_intent_prompt(self, messages: List[str]) -> str:
+        """
+        Tạo prompt phân tích intent cho một batch message.
+
+        Parameters:
+        -----------
+        messages : List[str]
+            Danh sách tin nhắn cần phân tích
+
+        Returns:
+        --------
+        str
+            Prompt cho LLM
+        """
+        numbered_messages = "\n".join(
+            f'{i}. "{message}"' for i, message in enumerate(messages, 1)
+        )
+
+        return (
+            f"\n        Phân tích ý định trong {len(messages)} tin nhắn sau của người dùng:\n\n"
+            f"        {numbered_messages}\n\n"
+            f"        Trả về kết quả dưới dạng JSON array gồm đúng {len(messages)} phần tử,\n"
+            "        phần tử thứ i tương ứng với tin nhắn thứ i. Mỗi phần tử có cấu trúc sau:\n"
+            + self._INTENT_FORMAT_GUIDE
+        )
     
     def _generate_cache_key(self, message: str) -> str:
         """
@@ -99,9 +449,14 @@ class IntentAnalyzer:
         str
             Cache key
         """
-        # Normalize and hash the message
-        normalized_message = message.lower().strip()
-        hash_key = hashlib.md5(normalized_message.encode()).hexdigest()
+        # Normalize trước khi hash: NFKC gom các biến thể Unicode của tiếng
+        # Việt (dấu tổ hợp vs dựng sẵn) về một dạng, casefold mạnh hơn lower
+        # cho ký tự ngoài ASCII, và whitespace được collapse — tăng tỷ lệ
+        # cache hit nên tiết kiệm trực tiếp LLM call.
+        normalized_message = _WS_RE.sub(
+            " ", unicodedata.normalize("NFKC", message).casefold().strip()
+        )
+        hash_key = xxhash.xxh3_64_hexdigest(normalized_message)
         return f"intent:{hash_key}"
     
     async def _get_from_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
@@ -121,10 +476,10 @@ class IntentAnalyzer:
         try:
             cached_data = await self.redis.get(cache_key)
             if cached_data:
-                return json.loads(cached_data)
+                return msgpack.unpackb(cached_data, raw=False)
         except Exception as e:
             logger.error(f"Error retrieving from cache: {str(e)}")
-        
+
         return None
     
     async def _cache_intent(self, cache_key: str, intent: Dict[str, Any]) -> None:
@@ -141,7 +496,7 @@ class IntentAnalyzer:
         try:
             await self.redis.set(
                 cache_key,
-                json.dumps(intent),
+                msgpack.packb(intent, use_bin_type=True),
                 ex=cache_config.INTENT_CACHE_TTL
             )
         except Exception as e:
@@ -173,25 +528,9 @@ class IntentAnalyzer:
             # Call LLM to analyze intent
             response = await self.llm_orchestrator.generate_structured_response(
                 prompt=prompt,
-                output_schema={
-                    "type": "object",
-                    "properties": {
-                        "type": {
-                            "type": "string",
-                            "enum": ["product_search", "order_status", "customer_support", "general"]
-                        },
-                        "keywords": {
-                            "type": "array",
-                            "items": {"type": "string"}
-                        },
-                        "order_id": {"type": "string"},
-                        "issue": {"type": "string"},
-                        "query": {"type": "string"}
-                    },
-                    "required": ["type"]
-                }
+                output_schema=self._INTENT_SCHEMA
             )
-            
+
             return response
             
         except Exception as e:
@@ -213,32 +552,8 @@ class IntentAnalyzer:
         str
             Prompt cho LLM
         """
-        return f"""
-        Phân tích ý định trong tin nhắn sau của người dùng: "{message}"
-        
-        Trả về kết quả dưới dạng JSON với cấu trúc sau:
-        
-        1. Nếu người dùng đang tìm sản phẩm:
-        {{
-            "type": "product_search",
-            "keywords": ["từ khóa 1", "từ khóa 2", ...]
-        }}
-        
-        2. Nếu người dùng đang hỏi về trạng thái đơn hàng:
-        {{
-            "type": "order_status",
-            "order_id": "mã đơn hàng nếu có"
-        }}
-        
-        3. Nếu người dùng cần hỗ trợ khách hàng:
-        {{
-            "type": "customer_support",
-            "issue": "vấn đề cần hỗ trợ"
-        }}
-        
-        4. Nếu là câu hỏi khác:
-        {{
-            "type": "general",
-            "query": "nội dung câu hỏi"
-        }}
-        """
\ No newline at end of file
+        return (
+            f'\n        Phân tích ý định trong tin nhắn sau của người dùng: "{message}"\n\n'
+            "        Trả về kết quả dưới dạng JSON với cấu trúc sau:\n"
+            + self._INTENT_FORMAT_GUIDE
+        )
\ No newline at end of file
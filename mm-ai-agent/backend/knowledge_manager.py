@@ -1,23 +1,328 @@
-# Delete conversation history
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Knowledge Manager Module cho Mega Market AI Agent.
+
+Module này quản lý tri thức và ngữ cảnh của hệ thống, bao gồm lịch sử
+hội thoại, kiến thức hỗ trợ khách hàng, đề xuất cá nhân hóa và thông tin
+chi tiết sản phẩm.
+"""
+
+import time
+import asyncio
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+import orjson
+import xxhash
+import redis.asyncio as redis
+from cachetools import TTLCache
+
+from utils.logging import setup_logger
+from utils.redis_pool import get_pool
+from config import get_cache_config, get_knowledge_config
+
+# Setup logging
+logger = setup_logger("knowledge_manager")
+
+# Load configuration
+cache_config = get_cache_config()
+knowledge_config = get_knowledge_config()
+
+
+class RawJson:
+    """
+    Payload JSON đã serialize sẵn.
+
+    Giữ nguyên bytes từ cache/generator để caller có thể forward thẳng
+    xuống response mà không parse lại; chỉ parse (một lần) khi thực sự
+    cần dict qua ``as_dict()``.
+    """
+
+    __slots__ = ("raw", "_parsed")
+
+    def __init__(self, raw):
+        self.raw = raw.encode() if isinstance(raw, str) else raw
+        self._parsed = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Parse payload thành dict, kết quả được giữ lại cho lần sau."""
+        if self._parsed is None:
+            self._parsed = orjson.loads(self.raw)
+        return self._parsed
+
+    def __bytes__(self) -> bytes:
+        return self.raw
+
+
+class KnowledgeManager:
+    """
+    Quản lý tri thức và ngữ cảnh của AI Agent.
+
+    Chịu trách nhiệm:
+    1. Lưu và truy xuất lịch sử hội thoại
+    2. Cung cấp kiến thức hỗ trợ khách hàng
+    3. Đề xuất sản phẩm cá nhân hóa
+    4. Ghi lại tương tác của người dùng
+    """
+
+    # Lua scripts cho cache-aside: mỗi thao tác là một EVALSHA duy nhất,
+    # SET kèm TTL là atomic per key nên không có khoảng hở giữa SET và EXPIRE
+    _CACHE_GET_LUA = "return redis.call('GET', KEYS[1])"
+    _CACHE_SET_LUA = "return redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])"
+
+    # Interaction log batching
+    _LOG_BATCH_MAX = 100
+    _LOG_BATCH_WAIT = 0.05  # seconds
+    _LOG_STREAM_MAXLEN = 1000  # entries giữ lại mỗi session stream
+
+    def __init__(self):
+        """Khởi tạo Knowledge Manager và kết nối Redis."""
+        # Setup Redis connection (pool dùng chung toàn process)
+        self.redis = redis.Redis(
+            connection_pool=get_pool(cache_config.REDIS_KNOWLEDGE_DB)
+        )
+
+        # Cache write chờ flush: các SET phát sinh trong cùng một tick của
+        # event loop được gom lại và gửi đi trong một pipeline duy nhất.
+        # Set giữ strong reference đến flush task — event loop chỉ giữ weak
+        # ref, không giữ lại thì task có thể bị GC trước khi chạy
+        self._pending_writes: List[Tuple[str, str, int]] = []
+        self._flush_scheduled = False
+        self._flush_tasks: set = set()
+
+        # Interaction log: fire-and-forget queue, drain bởi background task
+        self._log_queue: asyncio.Queue = asyncio.Queue(maxsize=10000)
+        self._log_flusher: Optional[asyncio.Task] = None
+
+        # L1 in-process cache cho product details: hit tại đây không tốn
+        # cả round-trip Redis (two-tier memory + Redis)
+        self._product_l1: TTLCache = TTLCache(
+            maxsize=2048,
+            ttl=min(cache_config.INTENT_L1_TTL, cache_config.PRODUCT_CACHE_TTL)
+        )
+
+        # register_script gửi EVALSHA và tự fallback EVAL khi NOSCRIPT
+        self._cache_get = self.redis.register_script(self._CACHE_GET_LUA)
+        self._cache_set = self.redis.register_script(self._CACHE_SET_LUA)
+
+        logger.info("Knowledge Manager initialized")
+
+    def _queue_cache_write(self, key: str, value: str, ttl: int) -> None:
+        """
+        Xếp một cache write vào hàng chờ, flush theo batch.
+
+        Các write phát sinh gần nhau (trong cùng tick) được gom thành một
+        pipeline — N round-trip trở thành 1.
+
+        Parameters:
+        -----------
+        key : str
+            Redis key
+        value : str
+            Giá trị đã serialize
+        ttl : int
+            TTL (giây)
+        """
+        self._pending_writes.append((key, value, ttl))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            task = asyncio.get_running_loop().create_task(
+                self._flush_pending_writes()
+            )
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_pending_writes(self) -> None:
+        """Flush tất cả cache write đang chờ trong một pipeline."""
+        # Nhường một tick để các write cùng đợt kịp xếp hàng
+        await asyncio.sleep(0)
+
+        writes, self._pending_writes = self._pending_writes, []
+        self._flush_scheduled = False
+
+        if not writes:
+            return
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value, ttl in writes:
+                # AsyncScript.__call__ là coroutine: phải await để lệnh
+                # thực sự được buffer lên pipeline (với client=pipe thì
+                # không có I/O, chỉ xếp EVALSHA vào command stack)
+                await self._cache_set(keys=[key], args=[value, ttl], client=pipe)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error flushing cache writes: {str(e)}")
+
+    async def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Lấy lịch sử hội thoại của một phiên làm việc.
+
+        Parameters:
+        -----------
+        session_id : str
+            ID phiên làm việc
+
+        Returns:
+        --------
+        List[Dict[str, Any]]
+            Danh sách các lượt hội thoại, cũ nhất trước
+        """
+        try:
+            history_key = f"conversation:{session_id}"
+            raw_entries = await self.redis.lrange(
+                history_key, -knowledge_config.MAX_HISTORY_MESSAGES, -1
+            )
+
+            return [orjson.loads(entry) for entry in raw_entries]
+
+        except Exception as e:
+            logger.error(f"Error retrieving conversation history: {str(e)}")
+            return []
+
+    async def save_conversation(
+        self,
+        session_id: str,
+        user_message: str,
+        agent_response: Any
+    ) -> bool:
+        """
+        Lưu một lượt hội thoại vào lịch sử.
+
+        Parameters:
+        -----------
+        session_id : str
+            ID phiên làm việc
+        user_message : str
+            Tin nhắn của người dùng
+        agent_response : AgentResponse
+            Phản hồi của agent
+
+        Returns:
+        --------
+        bool
+            True nếu lưu thành công, False nếu có lỗi
+        """
+        try:
+            history_key = f"conversation:{session_id}"
+            entry = orjson.dumps({
+                "user_message": user_message,
+                "agent_message": agent_response.message,
+                "response_type": agent_response.type,
+                "timestamp": time.time()
+            })
+
+            # RPUSH + LTRIM + EXPIRE trong một pipeline: 1 round-trip thay vì 3
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.rpush(history_key, entry)
+            pipe.ltrim(history_key, -knowledge_config.MAX_HISTORY_MESSAGES, -1)
+            pipe.expire(history_key, cache_config.CONVERSATION_TTL)
+            await pipe.execute()
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Error saving conversation: {str(e)}")
+            return False
+
+    async def get_support_knowledge(self, issue: str) -> Dict[str, Any]:
+        """
+        Lấy kiến thức hỗ trợ khách hàng liên quan đến một vấn đề.
+
+        Parameters:
+        -----------
+        issue : str
+            Vấn đề cần hỗ trợ
+
+        Returns:
+        --------
+        Dict[str, Any]
+            Kiến thức hỗ trợ liên quan
+        """
+        try:
+            # Check cache first
+            issue_hash = xxhash.xxh3_64_hexdigest(issue.lower().strip())
+            cache_key = f"support:{issue_hash}"
+            cached = await self._cache_get(keys=[cache_key])
+
+            if cached:
+                logger.info(f"Support knowledge cache hit for issue hash: {issue_hash}")
+                return orjson.loads(cached)
+
+            # In a real system, this would query a knowledge base
+            # For now, we use dummy support knowledge
+            knowledge = self._get_dummy_support_knowledge(issue)
+
+            # Cache the result
+            self._queue_cache_write(
+                cache_key,
+                orjson.dumps(knowledge),
+                cache_config.SUPPORT_CACHE_TTL
+            )
+
+            return knowledge
+
+        except Exception as e:
+            logger.error(f"Error retrieving support knowledge: {str(e)}")
+            return {}
+
+    def _get_dummy_support_knowledge(self, issue: str) -> Dict[str, Any]:
+        """
+        Generate dummy support knowledge.
+        In a real system, this would query a knowledge base.
+        """
+        return {
+            "issue": issue,
+            "topics": [
+                {
+                    "title": "Chính sách đổi trả",
+                    "content": "Mega Market hỗ trợ đổi trả trong vòng 7 ngày với hóa đơn mua hàng."
+                },
+                {
+                    "title": "Liên hệ hỗ trợ",
+                    "content": "Tổng đài 1900 1234 hoạt động từ 8h đến 22h hàng ngày."
+                }
+            ]
+        }
+
+    async def clear_session_data(self, session_id: str) -> bool:
+        """
+        Xóa dữ liệu của một phiên làm việc.
+
+        Parameters:
+        -----------
+        session_id : str
+            ID phiên làm việc
+
+        Returns:
+        --------
+        bool
+            True nếu xóa thành công, False nếu có lỗi
+        """
+        try:
+            # Delete conversation history
             history_key = f"conversation:{session_id}"
             await self.redis.delete(history_key)
-            
+
             logger.info(f"Cleared session data for session: {session_id}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Error clearing session data: {str(e)}")
             return False
-    
+
     async def get_personalized_recommendations(
-        self, 
-        user_id: str, 
+        self,
+        user_id: str,
         limit: int = 5,
         context: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Lấy đề xuất sản phẩm cá nhân hóa từ CDP.
-        
+
         Parameters:
         -----------
         user_id : str
@@ -26,7 +331,7 @@
             Số lượng sản phẩm đề xuất tối đa
         context : Dict[str, Any], optional
             Context bổ sung cho đề xuất
-            
+
         Returns:
         --------
         List[Dict[str, Any]]
@@ -35,46 +340,121 @@
         try:
             # Check cache first
             cache_key = f"recommendations:{user_id}"
-            cached = await self.redis.get(cache_key)
-            
+            cached = await self._cache_get(keys=[cache_key])
+
             if cached:
                 logger.info(f"Recommendations cache hit for user: {user_id}")
-                return json.loads(cached)
-            
+                return orjson.loads(cached)
+
             # In a real system, this would call the CDP API
             # For now, we use dummy recommendations
-            recommendations = self._get_dummy_recommendations(user_id, limit, context)
-            
-            # Cache the result
-            await self.redis.set(
+            interests = tuple(context["interests"]) if context and "interests" in context else ()
+            recommendations = self._build_dummy_recommendations(user_id, limit, interests)
+
+            # Cache the result (batched write, flushed in one pipeline)
+            self._queue_cache_write(
                 cache_key,
-                json.dumps(recommendations),
-                ex=cache_config.CDP_CACHE_TTL
+                orjson.dumps(recommendations),
+                cache_config.CDP_CACHE_TTL
             )
-            
+
             return recommendations
-            
+
         except Exception as e:
             logger.error(f"Error getting personalized recommendations: {str(e)}")
             return []
-    
-    def _get_dummy_recommendations(
-        self, 
-        user_id: str, 
+
+    async def get_personalized_recommendations_many(
+        self,
+        user_ids: List[str],
+        limit: int = 5
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lấy đề xuất cá nhân hóa cho nhiều người dùng cùng lúc.
+
+        Hit-check bằng một MGET và miss-fill bằng một pipeline duy nhất:
+        2 round-trip cho cả batch thay vì 2 round-trip mỗi user.
+
+        Parameters:
+        -----------
+        user_ids : List[str]
+            Danh sách ID người dùng
+        limit : int
+            Số lượng sản phẩm đề xuất tối đa mỗi user
+
+        Returns:
+        --------
+        Dict[str, List[Dict[str, Any]]]
+            Map user_id -> danh sách sản phẩm đề xuất
+        """
+        if not user_ids:
+            return {}
+
+        try:
+            keys = [f"recommendations:{user_id}" for user_id in user_ids]
+            cached = await self.redis.mget(keys)
+
+            results: Dict[str, List[Dict[str, Any]]] = {}
+            pipe = self.redis.pipeline(transaction=False)
+            misses = 0
+
+            for user_id, key, value in zip(user_ids, keys, cached):
+                if value is not None:
+                    results[user_id] = orjson.loads(value)
+                    continue
+
+                recommendations = self._build_dummy_recommendations(user_id, limit)
+                results[user_id] = recommendations
+                pipe.set(key, orjson.dumps(recommendations),
+                         ex=cache_config.CDP_CACHE_TTL)
+                misses += 1
+
+            if misses:
+                await pipe.execute()
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Error getting bulk recommendations: {str(e)}")
+            return {}
+
+    @classmethod
+    def _build_dummy_recommendations(
+        cls,
+        user_id: str,
         limit: int,
-        context: Optional[Dict[str, Any]] = None
+        interests: Tuple[str, ...] = ()
     ) -> List[Dict[str, Any]]:
         """
         Generate dummy personalized recommendations.
         In a real system, this would call the CDP API.
+
+        Trả về bản copy mới cho mỗi lần gọi: giá trị memoize là dùng
+        chung, nếu đưa thẳng ra ngoài thì caller mutate một dict là làm
+        bẩn cache cho mọi lần gọi sau (cùng lý do _copy_fallback bên
+        llm_orchestrator copy fallback trước khi trả).
+        """
+        return [
+            dict(item)
+            for item in cls._dummy_recommendations_cached(user_id, limit, interests)
+        ]
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _dummy_recommendations_cached(
+        user_id: str,
+        limit: int,
+        interests: Tuple[str, ...] = ()
+    ) -> Tuple[Dict[str, Any], ...]:
+        """
+        Build (và memoize) dummy recommendations cho một bộ tham số.
+
+        Kết quả deterministic theo (user_id, limit, interests) nên được
+        memoize in-process — các lần gọi lặp không build lại từ đầu.
         """
         # This is just placeholder data
-        categories = ["Điện tử", "Gia dụng", "Thời trang", "Thực phẩm"]
-        
-        # Use context if available
-        if context and "interests" in context:
-            categories = context["interests"]
-        
+        categories = list(interests) or ["Điện tử", "Gia dụng", "Thời trang", "Thực phẩm"]
+
         recommendations = []
         for i in range(1, limit + 1):
             category = categories[i % len(categories)]
@@ -87,19 +467,19 @@
                 "url": f"https://megamarket.vn/products/rec-{i}",
                 "reason": f"Dựa trên lịch sử mua hàng {category.lower()} của bạn"
             })
-        
-        return recommendations
-    
+
+        return tuple(recommendations)
+
     async def log_user_interaction(
-        self, 
-        session_id: str, 
+        self,
+        session_id: str,
         user_id: Optional[str],
         interaction_type: str,
         interaction_data: Dict[str, Any]
     ) -> bool:
         """
         Ghi lại tương tác của người dùng để phân tích sau này.
-        
+
         Parameters:
         -----------
         session_id : str
@@ -110,7 +490,7 @@
             Loại tương tác (chat, product_view, order, etc.)
         interaction_data : Dict[str, Any]
             Dữ liệu tương tác
-            
+
         Returns:
         --------
         bool
@@ -118,89 +498,201 @@
         """
         try:
             # Create interaction object
+            # Một lần đọc clock cho cả timestamp lẫn date
+            now = time.time()
             interaction = {
                 "session_id": session_id,
                 "user_id": user_id,
                 "interaction_type": interaction_type,
-                "timestamp": time.time(),
-                "date": datetime.now().isoformat(),
+                "timestamp": now,
+                "date": datetime.fromtimestamp(now).isoformat(),
                 "data": interaction_data
             }
-            
+
             # In a real system, this would be sent to an analytics service
             # For now, we just log it
             logger.info(f"User interaction: {interaction_type} from session {session_id}")
-            
-            # We could also store this in Redis for short-term analysis
-            interaction_key = f"interaction:{session_id}:{int(time.time())}"
-            await self.redis.set(
-                interaction_key,
-                json.dumps(interaction),
-                ex=cache_config.INTERACTION_TTL
-            )
-            
+
+            # Fire-and-forget: chỉ enqueue, background task drain theo batch —
+            # critical path của request không chờ Redis
+            self._ensure_log_flusher()
+            try:
+                self._log_queue.put_nowait((session_id, orjson.dumps(interaction)))
+            except asyncio.QueueFull:
+                # Queue đầy: bỏ bản ghi cũ nhất để nhận bản ghi mới
+                self._log_queue.get_nowait()
+                self._log_queue.put_nowait((session_id, orjson.dumps(interaction)))
+                logger.warning("Interaction log queue full, dropped oldest entry")
+
             return True
-            
+
         except Exception as e:
             logger.error(f"Error logging user interaction: {str(e)}")
             return False
-    
-    async def get_product_details(self, product_id: str) -> Dict[str, Any]:
+
+    def _ensure_log_flusher(self) -> None:
+        """Khởi động background task drain interaction log nếu chưa chạy."""
+        if self._log_flusher is None or self._log_flusher.done():
+            self._log_flusher = asyncio.get_running_loop().create_task(
+                self._drain_logs()
+            )
+
+    async def _drain_logs(self) -> None:
+        """
+        Drain interaction log theo batch.
+
+        Gom tối đa ``_LOG_BATCH_MAX`` bản ghi hoặc chờ tối đa
+        ``_LOG_BATCH_WAIT`` giây sau bản ghi đầu tiên, rồi ghi cả batch
+        trong một pipeline duy nhất.
+        """
+        while True:
+            batch = [await self._log_queue.get()]
+
+            deadline = asyncio.get_running_loop().time() + self._LOG_BATCH_WAIT
+            while len(batch) < self._LOG_BATCH_MAX:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._log_queue.get(), timeout=remaining)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                # Mỗi session một stream key: XADD giữ keyspace bounded
+                # (MAXLEN ~) thay vì một key mới cho mỗi event
+                pipe = self.redis.pipeline(transaction=False)
+                touched = set()
+                for session_id, blob in batch:
+                    stream_key = f"interactions:{session_id}"
+                    pipe.xadd(stream_key, {"data": blob},
+                              maxlen=self._LOG_STREAM_MAXLEN, approximate=True)
+                    touched.add(stream_key)
+                for stream_key in touched:
+                    pipe.expire(stream_key, cache_config.INTERACTION_TTL)
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Error draining interaction logs: {str(e)}")
+
+    async def get_product_details(self, product_id: str) -> RawJson:
         """
         Lấy thông tin chi tiết về sản phẩm.
-        
+
         Parameters:
         -----------
         product_id : str
             ID sản phẩm
-            
+
         Returns:
         --------
-        Dict[str, Any]
-            Thông tin chi tiết sản phẩm
+        RawJson
+            Thông tin chi tiết sản phẩm dạng JSON đã serialize;
+            gọi ``as_dict()`` nếu cần dict
         """
         try:
-            # Check cache first
+            # L1 in-process cache: hit tại đây không tốn round-trip Redis
+            l1_hit = self._product_l1.get(product_id)
+            if l1_hit is not None:
+                return RawJson(l1_hit)
+
+            # Check Redis cache
             cache_key = f"product:detail:{product_id}"
-            cached = await self.redis.get(cache_key)
-            
+            cached = await self._cache_get(keys=[cache_key])
+
             if cached:
                 logger.info(f"Product details cache hit for: {product_id}")
-                return json.loads(cached)
-            
+                self._product_l1[product_id] = cached
+                return RawJson(cached)
+
             # In a real system, this would query the database or API
-            # For now, we use dummy data
-            product = self._get_dummy_product_details(product_id)
-            
-            # Cache the result
-            await self.redis.set(
+            # For now, we use dummy data. Payload được serialize một lần
+            # và cache đúng bytes đó — hit sau không re-encode.
+            blob = self._get_dummy_product_details(product_id)
+
+            # Cache the result (batched write, flushed in one pipeline)
+            self._queue_cache_write(
                 cache_key,
-                json.dumps(product),
-                ex=cache_config.PRODUCT_CACHE_TTL
+                blob,
+                cache_config.PRODUCT_CACHE_TTL
             )
-            
-            return product
-            
+            self._product_l1[product_id] = blob
+
+            return RawJson(blob)
+
         except Exception as e:
             logger.error(f"Error retrieving product details: {str(e)}")
-            return {"error": str(e)}
-    
-    def _get_dummy_product_details(self, product_id: str) -> Dict[str, Any]:
+            return RawJson(orjson.dumps({"error": str(e)}))
+
+    async def get_product_details_many(self, product_ids: List[str]) -> Dict[str, RawJson]:
+        """
+        Lấy chi tiết nhiều sản phẩm cùng lúc.
+
+        Hit-check bằng một MGET và miss-fill bằng một pipeline duy nhất.
+
+        Parameters:
+        -----------
+        product_ids : List[str]
+            Danh sách ID sản phẩm
+
+        Returns:
+        --------
+        Dict[str, RawJson]
+            Map product_id -> payload chi tiết sản phẩm
+        """
+        if not product_ids:
+            return {}
+
+        try:
+            keys = [f"product:detail:{product_id}" for product_id in product_ids]
+            cached = await self.redis.mget(keys)
+
+            results: Dict[str, RawJson] = {}
+            pipe = self.redis.pipeline(transaction=False)
+            misses = 0
+
+            for product_id, key, value in zip(product_ids, keys, cached):
+                if value is not None:
+                    results[product_id] = RawJson(value)
+                    continue
+
+                blob = self._get_dummy_product_details(product_id)
+                results[product_id] = RawJson(blob)
+                self._product_l1[product_id] = blob
+                pipe.set(key, blob, ex=cache_config.PRODUCT_CACHE_TTL)
+                misses += 1
+
+            if misses:
+                await pipe.execute()
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Error getting bulk product details: {str(e)}")
+            return {}
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def _get_dummy_product_details(product_id: str) -> bytes:
         """
         Generate dummy product details.
         In a real system, this would query the database or API.
+
+        Output deterministic theo product_id nên được memoize in-process.
         """
         # Generate consistent dummy data based on product_id
-        hash_val = int(hashlib.md5(product_id.encode()).hexdigest(), 16) % 10000
-        
+        # (xxh3 trả int trực tiếp — không qua hex string như MD5 trước đây)
+        hash_val = xxhash.xxh3_64_intdigest(product_id) % 10000
+
         categories = ["Điện tử", "Gia dụng", "Thời trang", "Thực phẩm"]
         brands = ["Samsung", "LG", "Sony", "Apple", "Xiaomi", "Philips", "Sunhouse"]
-        
+
         # Use hash_val to deterministically select category and brand
         category = categories[hash_val % len(categories)]
         brand = brands[(hash_val // 10) % len(brands)]
-        
-        return {
+
+        product = {
             "id": product_id,
             "name": f"{brand} {category} Product {hash_val}",
             "brand": brand,
@@ -219,4 +711,7 @@
                 "Trọng lượng": f"{500 + (hash_val % 1500)}g"
             },
             "url": f"https://megamarket.vn/products/{product_id}"
-        }
\ No newline at end of file
+        }
+
+        # Serialize một lần tại nguồn — cache và caller dùng chung blob này
+        return orjson.dumps(product)
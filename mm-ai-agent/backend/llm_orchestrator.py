@@ -9,23 +9,177 @@ cho phép hệ thống dễ dàng chuyển đổi giữa các nhà cung cấp LL
 ảnh hưởng đến code nghiệp vụ.
 """
 
+import re
 import json
 import time
+import asyncio
+from functools import lru_cache
+
+import orjson
+import xxhash
 from typing import Dict, Any, List, Optional, Union, Type
 
+import redis.asyncio as redis
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from utils.logging import setup_logger
-from config import LLMConfig
+from utils.redis_pool import get_pool
+from config import get_llm_config, get_cache_config
 
 # Setup logging
 logger = setup_logger("llm_orchestrator")
 
 # Load configuration
-config = LLMConfig()
+config = get_llm_config()
+cache_config = get_cache_config()
+
+
+class CircuitOpenError(Exception):
+    """Raised khi circuit breaker đang mở và call bị từ chối ngay lập tức."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker đơn giản cho các call đến LLM provider.
+
+    Khi provider lỗi liên tiếp quá fail_max lần, breaker mở và mọi call
+    bị từ chối ngay (không chờ hết timeout), tránh dồn hàng trăm task
+    treo 15s mỗi task khi provider gặp sự cố. Sau reset_timeout giây,
+    breaker chuyển half-open: cho một call thử; thành công thì đóng lại.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0):
+        """
+        Khởi tạo circuit breaker.
+
+        Parameters:
+        -----------
+        fail_max : int
+            Số lỗi liên tiếp trước khi mở breaker
+        reset_timeout : float
+            Số giây chờ trước khi thử lại (half-open)
+        """
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """Trạng thái hiện tại: 'closed', 'open' hoặc 'half-open'."""
+        if self._opened_at is None:
+            return "closed"
+        if time.time() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Cho phép call đi qua hay không."""
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        """Ghi nhận call thành công: đóng breaker lại."""
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Ghi nhận call thất bại: mở (hoặc mở lại) breaker nếu vượt ngưỡng."""
+        self._failures += 1
+        if self._failures >= self.fail_max:
+            if self.state != "open":
+                logger.warning(f"Circuit breaker opened after {self._failures} consecutive failures")
+            # Luôn cập nhật mốc mở: lỗi trong half-open phải mở lại breaker,
+            # nếu không sau reset_timeout đầu tiên breaker kẹt ở half-open
+            # và cho mọi call đi qua suốt thời gian provider còn sập
+            self._opened_at = time.time()
+
+
+# Role -> langchain message class: tra cứu dict O(1) thay vì chuỗi if/elif,
+# và cả ba provider dùng chung một converter duy nhất
+_ROLE_TO_MESSAGE = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+    "system": SystemMessage,
+}
+
+
+# Markdown fence bọc JSON response: strip bằng một lần sub trên regex đã
+# compile thay vì chuỗi replace().replace().strip() allocate 3 string trung gian
+_MD_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+# Default system prompt: dựng một lần, mọi call không truyền system_prompt
+# dùng chung dict này (chỉ đọc) — và qua _cached_message cũng dùng chung
+# một SystemMessage object duy nhất
+_DEFAULT_SYSTEM_PROMPT = {
+    "role": "system",
+    "content": "Bạn là trợ lý AI của Mega Market, một hệ thống siêu thị bán lẻ lớn tại Việt Nam. "
+               "Hãy trả lời ngắn gọn, hữu ích và thân thiện. Nếu bạn không biết câu trả lời, "
+               "hãy đề xuất khách hàng liên hệ tổng đài 1900 1234 để được hỗ trợ."
+}
+
+
+# SystemMessage bất biến, dựng một lần — không allocate lại mỗi call
+_JSON_SYSTEM_MESSAGE = SystemMessage(
+    content="You must respond with valid JSON only, no other text."
+)
+
+
+@lru_cache(maxsize=4096)
+def _cached_message(role: str, content: str):
+    """
+    Dựng (và memoize) một langchain message theo (role, content).
+
+    Lịch sử hội thoại lặp lại gần nguyên vẹn giữa các turn — n-1 message
+    của turn trước xuất hiện lại ở turn sau. Message objects là immutable
+    nên các turn dùng chung object thay vì allocate lại mỗi lần.
+    """
+    return _ROLE_TO_MESSAGE[role](content=content)
+
+
+def _convert_to_langchain_messages(messages: List[Dict[str, str]]):
+    """Convert messages dạng {"role", "content"} sang langchain messages."""
+    return [
+        _cached_message(msg["role"], msg["content"])
+        for msg in messages
+        if msg["role"] in _ROLE_TO_MESSAGE
+    ]
+
+
+@lru_cache(maxsize=128)
+def _minimal_fallback(schema_json: bytes) -> Dict[str, Any]:
+    """
+    Dựng response tối thiểu hợp lệ cho một schema (memoize theo schema).
+
+    Số schema trong hệ thống là hữu hạn và cố định, nên vòng lặp qua
+    properties chỉ chạy một lần cho mỗi schema thay vì mỗi lần fail —
+    dưới load spike (nhiều request fail cùng lúc) fallback trả về O(1).
+    """
+    output_schema = orjson.loads(schema_json)
+
+    minimal_response = {"error": "Could not generate structured response"}
+    for key, val in output_schema.get("properties", {}).items():
+        if key in output_schema.get("required", []):
+            if val.get("type") == "string":
+                minimal_response[key] = ""
+            elif val.get("type") == "array":
+                minimal_response[key] = []
+            elif val.get("type") == "object":
+                minimal_response[key] = {}
+            else:
+                minimal_response[key] = None
+
+    return minimal_response
+
+
+def _copy_fallback(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy template fallback, tách riêng các container mutable."""
+    return {
+        key: (list(val) if isinstance(val, list)
+              else dict(val) if isinstance(val, dict) else val)
+        for key, val in template.items()
+    }
 
 
 class LLMProviderInterface:
@@ -64,244 +218,131 @@ class LLMProviderInterface:
         raise NotImplementedError("Must be implemented by subclass")
 
 
-class OpenAIProvider(LLMProviderInterface):
-    """OpenAI (GPT) Provider."""
-    
-    def __init__(self, model_name=None, api_key=None, **kwargs):
+class LangChainProvider(LLMProviderInterface):
+    """
+    Provider dùng chung cho mọi chat model của langchain.
+
+    Ba provider cũ (OpenAI/Anthropic/Google) là bản copy-paste của nhau;
+    mọi khác biệt thực sự nằm ở chat model được inject qua constructor.
+    """
+
+    def __init__(self, name: str, chat_model):
         """
-        Initialize OpenAI provider.
-        
+        Initialize provider.
+
         Parameters:
         -----------
-        model_name : str, optional
-            Tên model (default: config.OPENAI_MODEL)
-        api_key : str, optional
-            API key (default: config.OPENAI_API_KEY)
+        name : str
+            Tên provider (dùng cho logging)
+        chat_model : BaseChatModel
+            Chat model langchain đã cấu hình sẵn
         """
-        model_name = model_name or config.OPENAI_MODEL
-        api_key = api_key or config.OPENAI_API_KEY
-        
-        self.model = ChatOpenAI(
-            model_name=model_name,
-            api_key=api_key,
-            temperature=kwargs.get("temperature", 0.3)
-        )
-        
-        logger.info(f"OpenAI provider initialized with model: {model_name}")
-    
+        self.name = name
+        self.model = chat_model
+
+        logger.info(f"{name} provider initialized")
+
     async def generate(self, messages: List[Dict[str, str]], **kwargs) -> str:
-        """Generate text từ OpenAI."""
+        """Generate text từ provider."""
         try:
             # Convert messages format for langchain
-            lc_messages = self._convert_to_langchain_messages(messages)
-            
-            # Call OpenAI
+            lc_messages = _convert_to_langchain_messages(messages)
+
             response = await self.model.ainvoke(lc_messages)
-            
+
             return response.content
-            
+
         except Exception as e:
-            logger.error(f"Error generating from OpenAI: {str(e)}")
+            logger.error(f"Error generating from {self.name}: {str(e)}")
             raise
-    
+
     async def generate_json(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
-        """Generate JSON từ OpenAI."""
+        """Generate JSON từ provider."""
         try:
-            # Add instruction to return valid JSON
-            messages.append({
-                "role": "system",
-                "content": "You must respond with valid JSON only, no other text."
-            })
-            
-            # Convert messages format for langchain
-            lc_messages = self._convert_to_langchain_messages(messages)
-            
-            # Call OpenAI
+            # Convert messages format for langchain, rồi thêm JSON instruction
+            # vào list langchain (list mới) — không mutate messages của caller,
+            # tránh double-append khi orchestrator retry/fallback
+            lc_messages = _convert_to_langchain_messages(messages)
+            lc_messages.append(_JSON_SYSTEM_MESSAGE)
+
             response = await self.model.ainvoke(lc_messages)
-            content = response.content.strip()
-            
+
             # Clean up any markdown wrapping
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            
-            # Parse JSON
-            return json.loads(content)
-            
+            content = _MD_FENCE_RE.sub("", response.content).strip()
+
+            # Parse JSON (orjson: SIMD-accelerated C parser)
+            return orjson.loads(content)
+
         except Exception as e:
-            logger.error(f"Error generating JSON from OpenAI: {str(e)}")
+            logger.error(f"Error generating JSON from {self.name}: {str(e)}")
             raise
-    
-    def _convert_to_langchain_messages(self, messages: List[Dict[str, str]]):
-        """Convert messages to langchain format."""
-        lc_messages = []
-        for msg in messages:
-            if msg["role"] == "user":
-                lc_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                lc_messages.append(AIMessage(content=msg["content"]))
-            elif msg["role"] == "system":
-                lc_messages.append(SystemMessage(content=msg["content"]))
-        return lc_messages
-
-
-class AnthropicProvider(LLMProviderInterface):
-    """Anthropic (Claude) Provider."""
-    
-    def __init__(self, model_name=None, api_key=None, **kwargs):
+
+    async def generate_stream(self, messages: List[Dict[str, str]], **kwargs):
         """
-        Initialize Anthropic provider.
-        
-        Parameters:
-        -----------
-        model_name : str, optional
-            Tên model (default: config.ANTHROPIC_MODEL)
-        api_key : str, optional
-            API key (default: config.ANTHROPIC_API_KEY)
+        Stream từng đoạn text từ provider.
+
+        astream trả chunk ngay khi model sinh ra — time-to-first-token
+        không phải chờ cả completion như ainvoke.
         """
-        model_name = model_name or config.ANTHROPIC_MODEL
-        api_key = api_key or config.ANTHROPIC_API_KEY
-        
-        self.model = ChatAnthropic(
-            model_name=model_name,
-            api_key=api_key,
-            temperature=kwargs.get("temperature", 0.3)
-        )
-        
-        logger.info(f"Anthropic provider initialized with model: {model_name}")
-    
-    async def generate(self, messages: List[Dict[str, str]], **kwargs) -> str:
-        """Generate text từ Anthropic."""
         try:
-            # Convert messages format for langchain
-            lc_messages = self._convert_to_langchain_messages(messages)
-            
-            # Call Anthropic
-            response = await self.model.ainvoke(lc_messages)
-            
-            return response.content
-            
-        except Exception as e:
-            logger.error(f"Error generating from Anthropic: {str(e)}")
-            raise
-    
-    async def generate_json(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
-        """Generate JSON từ Anthropic."""
-        try:
-            # Add instruction to return valid JSON
-            messages.append({
-                "role": "system",
-                "content": "You must respond with valid JSON only, no other text."
-            })
-            
-            # Convert messages format for langchain
-            lc_messages = self._convert_to_langchain_messages(messages)
-            
-            # Call Anthropic
-            response = await self.model.ainvoke(lc_messages)
-            content = response.content.strip()
-            
-            # Clean up any markdown wrapping
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            
-            # Parse JSON
-            return json.loads(content)
-            
+            lc_messages = _convert_to_langchain_messages(messages)
+
+            async for chunk in self.model.astream(lc_messages):
+                if chunk.content:
+                    yield chunk.content
+
         except Exception as e:
-            logger.error(f"Error generating JSON from Anthropic: {str(e)}")
+            logger.error(f"Error streaming from {self.name}: {str(e)}")
             raise
-    
-    def _convert_to_langchain_messages(self, messages: List[Dict[str, str]]):
-        """Convert messages to langchain format."""
-        lc_messages = []
-        for msg in messages:
-            if msg["role"] == "user":
-                lc_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                lc_messages.append(AIMessage(content=msg["content"]))
-            elif msg["role"] == "system":
-                lc_messages.append(SystemMessage(content=msg["content"]))
-        return lc_messages
-
-
-class GoogleProvider(LLMProviderInterface):
-    """Google (Gemini) Provider."""
-    
-    def __init__(self, model_name=None, api_key=None, **kwargs):
-        """
-        Initialize Google provider.
-        
-        Parameters:
-        -----------
-        model_name : str, optional
-            Tên model (default: config.GOOGLE_MODEL)
-        api_key : str, optional
-            API key (default: config.GOOGLE_API_KEY)
-        """
-        model_name = model_name or config.GOOGLE_MODEL
-        api_key = api_key or config.GOOGLE_API_KEY
-        
-        self.model = ChatGoogleGenerativeAI(
-            model=model_name,
-            google_api_key=api_key,
-            temperature=kwargs.get("temperature", 0.3)
+
+
+def build_provider(name: str) -> LangChainProvider:
+    """
+    Tạo provider theo tên, lazy-import package langchain tương ứng.
+
+    Chỉ provider được bật trong config mới bị import — process không trả
+    giá import cho cả ba SDK lúc cold start.
+
+    Parameters:
+    -----------
+    name : str
+        Tên provider ("openai", "anthropic", "google")
+
+    Returns:
+    --------
+    LangChainProvider
+        Provider đã khởi tạo
+
+    Raises:
+    -------
+    ValueError
+        Nếu tên provider không được hỗ trợ
+    """
+    if name == "openai":
+        from langchain_openai import ChatOpenAI
+        model = ChatOpenAI(
+            model_name=config.OPENAI_MODEL,
+            api_key=config.OPENAI_API_KEY,
+            temperature=config.OPENAI_TEMPERATURE
         )
-        
-        logger.info(f"Google provider initialized with model: {model_name}")
-    
-    async def generate(self, messages: List[Dict[str, str]], **kwargs) -> str:
-        """Generate text từ Google."""
-        try:
-            # Convert messages format for langchain
-            lc_messages = self._convert_to_langchain_messages(messages)
-            
-            # Call Google
-            response = await self.model.ainvoke(lc_messages)
-            
-            return response.content
-            
-        except Exception as e:
-            logger.error(f"Error generating from Google: {str(e)}")
-            raise
-    
-    async def generate_json(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
-        """Generate JSON từ Google."""
-        try:
-            # Add instruction to return valid JSON
-            messages.append({
-                "role": "system",
-                "content": "You must respond with valid JSON only, no other text."
-            })
-            
-            # Convert messages format for langchain
-            lc_messages = self._convert_to_langchain_messages(messages)
-            
-            # Call Google
-            response = await self.model.ainvoke(lc_messages)
-            content = response.content.strip()
-            
-            # Clean up any markdown wrapping
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            
-            # Parse JSON
-            return json.loads(content)
-            
-        except Exception as e:
-            logger.error(f"Error generating JSON from Google: {str(e)}")
-            raise
-    
-    def _convert_to_langchain_messages(self, messages: List[Dict[str, str]]):
-        """Convert messages to langchain format."""
-        lc_messages = []
-        for msg in messages:
-            if msg["role"] == "user":
-                lc_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                lc_messages.append(AIMessage(content=msg["content"]))
-            elif msg["role"] == "system":
-                lc_messages.append(SystemMessage(content=msg["content"]))
-        return lc_messages
+    elif name == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+        model = ChatAnthropic(
+            model_name=config.ANTHROPIC_MODEL,
+            api_key=config.ANTHROPIC_API_KEY,
+            temperature=config.ANTHROPIC_TEMPERATURE
+        )
+    elif name == "google":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        model = ChatGoogleGenerativeAI(
+            model=config.GOOGLE_MODEL,
+            google_api_key=config.GOOGLE_API_KEY,
+            temperature=config.GOOGLE_TEMPERATURE
+        )
+    else:
+        raise ValueError(f"Unsupported provider: {name}")
+
+    return LangChainProvider(name, model)
 
 
 class LLMOrchestrator:
@@ -309,6 +350,9 @@ class LLMOrchestrator:
     Orchestrator cho các LLM, cung cấp một interface thống nhất
     và khả năng chuyển đổi giữa các provider.
     """
+
+    # Trọng số cho mẫu mới nhất trong EWMA latency
+    _EWMA_ALPHA = 0.2
     
     def __init__(self, default_provider: str = None):
         """
@@ -322,54 +366,140 @@ class LLMOrchestrator:
         self.providers = {}
         self.default_provider = default_provider or config.DEFAULT_PROVIDER
         
-        # Initialize providers based on config
-        if config.ENABLED_PROVIDERS.get("openai", False):
-            self.providers["openai"] = OpenAIProvider()
-        
-        if config.ENABLED_PROVIDERS.get("anthropic", False):
-            self.providers["anthropic"] = AnthropicProvider()
-        
-        if config.ENABLED_PROVIDERS.get("google", False):
-            self.providers["google"] = GoogleProvider()
+        # Initialize providers based on config (lazy-import theo provider)
+        for name, enabled in config.ENABLED_PROVIDERS.items():
+            if enabled:
+                self.providers[name] = build_provider(name)
         
         if not self.providers:
             raise ValueError("No LLM providers configured")
-        
+
         if self.default_provider not in self.providers:
             self.default_provider = list(self.providers.keys())[0]
+
+        # Circuit breaker riêng cho từng provider: provider sập không kéo
+        # theo hàng loạt task chờ timeout
+        self._breakers = {
+            name: CircuitBreaker(
+                fail_max=config.LLM_BREAKER_FAIL_MAX,
+                reset_timeout=config.LLM_BREAKER_RESET_TIMEOUT
+            )
+            for name in self.providers
+        }
+
+        # EWMA latency (giây) theo provider: 0.0 = chưa có mẫu
+        self._latency_ewma: Dict[str, float] = {name: 0.0 for name in self.providers}
+
+        # Cache response LLM cho các call đánh dấu cacheable: prompt trùng
+        # nhau (greeting, FAQ) trả lời từ Redis thay vì gọi API trả phí
+        self._response_cache = redis.Redis(
+            connection_pool=get_pool(cache_config.REDIS_LLM_DB)
+        )
         
         logger.info(f"LLM Orchestrator initialized with default provider: {self.default_provider}")
     
+    def _select_provider(self) -> str:
+        """
+        Chọn provider healthy có EWMA latency thấp nhất.
+
+        Provider có breaker đang mở bị loại; provider chưa có mẫu latency
+        (EWMA = 0) được ưu tiên thử trước. Nếu tất cả breaker đều mở,
+        trả về default để call thất bại với CircuitOpenError rõ ràng.
+
+        Returns:
+        --------
+        str
+            Tên provider được chọn
+        """
+        healthy = [name for name in self.providers if self._breakers[name].allow()]
+        if not healthy:
+            return self.default_provider
+
+        return min(healthy, key=lambda name: self._latency_ewma[name])
+
     def get_provider(self, provider_name: Optional[str] = None) -> LLMProviderInterface:
         """
         Lấy provider dựa trên tên.
-        
+
         Parameters:
         -----------
         provider_name : str, optional
-            Tên provider, nếu None sẽ dùng default
-            
+            Tên provider, nếu None chọn provider healthy nhanh nhất
+            (theo EWMA latency, bỏ qua provider có breaker đang mở)
+
         Returns:
         --------
         LLMProviderInterface
             Provider instance
         """
-        provider_name = provider_name or self.default_provider
+        provider_name = provider_name or self._select_provider()
         if provider_name not in self.providers:
             raise ValueError(f"Provider {provider_name} not configured")
-        
+
         return self.providers[provider_name]
-    
-    async def generate_response(
-        self, 
+
+    async def _call_provider(
+        self,
+        provider_name: Optional[str],
+        method: str,
+        messages: List[Dict[str, str]]
+    ):
+        """
+        Gọi provider qua circuit breaker tương ứng.
+
+        Parameters:
+        -----------
+        provider_name : str, optional
+            Tên provider, nếu None sẽ dùng default
+        method : str
+            Tên method trên provider ("generate" hoặc "generate_json")
+        messages : List[Dict[str, str]]
+            Messages gửi đến provider
+
+        Returns:
+        --------
+        Kết quả từ provider
+
+        Raises:
+        -------
+        CircuitOpenError
+            Nếu breaker của provider đang mở
+        """
+        name = provider_name or self._select_provider()
+        breaker = self._breakers[name]
+
+        if not breaker.allow():
+            raise CircuitOpenError(f"LLM provider '{name}' circuit is open")
+
+        provider = self.get_provider(name)
+        start_time = time.time()
+        try:
+            result = await getattr(provider, method)(messages)
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        breaker.record_success()
+
+        # Cập nhật EWMA latency cho selection các call sau
+        duration = time.time() - start_time
+        prev = self._latency_ewma[name]
+        self._latency_ewma[name] = (
+            duration if prev == 0.0
+            else self._EWMA_ALPHA * duration + (1 - self._EWMA_ALPHA) * prev
+        )
+
+        return result
+
+    def _build_chat_messages(
+        self,
         query: str,
         conversation_history: Optional[List[Dict[str, Any]]] = None,
-        system_prompt: Optional[str] = None,
-        provider_name: Optional[str] = None
-    ) -> str:
+        system_prompt: Optional[str] = None
+    ) -> List[Dict[str, str]]:
         """
-        Generate text response dựa trên query và history.
-        
+        Dựng list messages (system + history + query) cho chat call.
+
         Parameters:
         -----------
         query : str
@@ -377,36 +507,24 @@ class LLMOrchestrator:
         conversation_history : List[Dict[str, Any]], optional
             Lịch sử hội thoại
         system_prompt : str, optional
-            System prompt
-        provider_name : str, optional
-            Tên provider, nếu None sẽ dùng default
-            
+            System prompt, nếu None dùng prompt mặc định
+
         Returns:
         --------
-        str
-            Text response
+        List[Dict[str, str]]
+            Messages dạng {"role", "content"}
         """
-        # Get provider
-        provider = self.get_provider(provider_name)
-        
-        # Format conversation history
         messages = []
-        
-        # Add system prompt if provided
+
+        # Add system prompt if provided, else dùng constant mặc định
         if system_prompt:
             messages.append({
                 "role": "system",
                 "content": system_prompt
             })
         else:
-            # Default system prompt
-            messages.append({
-                "role": "system",
-                "content": "Bạn là trợ lý AI của Mega Market, một hệ thống siêu thị bán lẻ lớn tại Việt Nam. "
-                           "Hãy trả lời ngắn gọn, hữu ích và thân thiện. Nếu bạn không biết câu trả lời, "
-                           "hãy đề xuất khách hàng liên hệ tổng đài 1900 1234 để được hỗ trợ."
-            })
-        
+            messages.append(_DEFAULT_SYSTEM_PROMPT)
+
         # Add conversation history
         if conversation_history:
             for msg in conversation_history[-10:]:  # Limit to last 10 messages
@@ -420,20 +538,92 @@ class LLMOrchestrator:
                         "role": "assistant",
                         "content": msg["agent_message"]
                     })
-        
+
         # Add current query
         messages.append({
             "role": "user",
             "content": query
         })
+
+        return messages
+
+    def _response_cache_key(
+        self,
+        provider_name: Optional[str],
+        method: str,
+        messages: List[Dict[str, str]]
+    ) -> str:
+        """Build cache key từ provider + method + nội dung messages."""
+        name = provider_name or self.default_provider
+        digest = xxhash.xxh3_64_hexdigest(name.encode() + orjson.dumps(messages))
+        return f"llmc:{method}:{digest}"
+
+    async def _get_cached_response(self, cache_key: str) -> Optional[str]:
+        """Đọc cache response; lỗi Redis thì coi như miss (fail open)."""
+        try:
+            return await self._response_cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"Error reading LLM response cache: {str(e)}")
+            return None
+
+    async def _cache_response(self, cache_key: str, value: str) -> None:
+        """Ghi cache response với TTL ngắn; lỗi Redis chỉ log."""
+        try:
+            await self._response_cache.set(cache_key, value, ex=config.LLM_CACHE_TTL)
+        except Exception as e:
+            logger.error(f"Error writing LLM response cache: {str(e)}")
+
+    async def generate_response(
+        self, 
+        query: str,
+        conversation_history: Optional[List[Dict[str, Any]]] = None,
+        system_prompt: Optional[str] = None,
+        provider_name: Optional[str] = None,
+        cacheable: bool = False
+    ) -> str:
+        """
+        Generate text response dựa trên query và history.
         
+        Parameters:
+        -----------
+        query : str
+            Câu hỏi của người dùng
+        conversation_history : List[Dict[str, Any]], optional
+            Lịch sử hội thoại
+        system_prompt : str, optional
+            System prompt
+        provider_name : str, optional
+            Tên provider, nếu None sẽ dùng default
+        cacheable : bool
+            Cho phép cache response theo hash của messages (chỉ bật cho
+            các path không chứa dữ liệu nhạy cảm)
+            
+        Returns:
+        --------
+        str
+            Text response
+        """
+        messages = self._build_chat_messages(query, conversation_history, system_prompt)
+        
+        # Check response cache
+        cache_key = None
+        if cacheable:
+            cache_key = self._response_cache_key(provider_name, "generate", messages)
+            cached = await self._get_cached_response(cache_key)
+            if cached is not None:
+                logger.info("LLM response cache hit")
+                return cached
+
         # Generate response
         try:
             start_time = time.time()
-            response = await provider.generate(messages)
+            response = await self._call_provider(provider_name, "generate", messages)
             duration = time.time() - start_time
             
             logger.info(f"Generated response in {duration:.2f}s using {provider_name or self.default_provider}")
+
+            if cache_key is not None:
+                await self._cache_response(cache_key, response)
             
             return response
             
@@ -448,11 +638,130 @@ class LLMOrchestrator:
             # If all fails, return generic message
             return "Xin lỗi, tôi không thể trả lời câu hỏi của bạn lúc này. Vui lòng thử lại sau hoặc liên hệ tổng đài 1900 1234 để được hỗ trợ."
     
+    async def generate_response_race(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, Any]]] = None,
+        system_prompt: Optional[str] = None,
+        providers: Optional[List[str]] = None
+    ) -> str:
+        """
+        Gọi song song nhiều provider, lấy response về đích trước.
+
+        Opt-in cho các call nhạy cảm về latency: p99 trở thành min của các
+        provider thay vì chịu tail latency của một provider duy nhất.
+        Lưu ý mỗi call trả phí cho mọi provider tham gia — không dùng
+        làm mặc định.
+
+        Parameters:
+        -----------
+        query : str
+            Câu hỏi của người dùng
+        conversation_history : List[Dict[str, Any]], optional
+            Lịch sử hội thoại
+        system_prompt : str, optional
+            System prompt
+        providers : List[str], optional
+            Các provider tham gia race, mặc định tất cả provider đã bật
+
+        Returns:
+        --------
+        str
+            Response của provider hoàn thành sớm nhất
+        """
+        messages = self._build_chat_messages(query, conversation_history, system_prompt)
+
+        # Chỉ race giữa các provider đang healthy (breaker đóng)
+        names = [
+            name for name in (providers or list(self.providers))
+            if name in self.providers and self._breakers[name].allow()
+        ]
+
+        if len(names) == 1:
+            return await self._call_provider(names[0], "generate", messages)
+
+        tasks = {
+            asyncio.create_task(self._call_provider(name, "generate", messages)): name
+            for name in names
+        }
+        pending = set(tasks)
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks[task]
+                        logger.info(f"Provider race won by {winner}")
+                        return task.result()
+                    logger.error(
+                        f"Provider {tasks[task]} failed in race: {task.exception()}"
+                    )
+        finally:
+            # Hủy các call còn chạy — không chờ (và không trả phí thêm) cho kẻ thua
+            for task in pending:
+                task.cancel()
+
+        # Tất cả provider đều fail
+        return "Xin lỗi, tôi không thể trả lời câu hỏi của bạn lúc này. Vui lòng thử lại sau hoặc liên hệ tổng đài 1900 1234 để được hỗ trợ."
+
+    async def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, Any]]] = None,
+        system_prompt: Optional[str] = None,
+        provider_name: Optional[str] = None
+    ):
+        """
+        Stream response theo từng đoạn text thay vì chờ cả completion.
+
+        Parameters:
+        -----------
+        query : str
+            Câu hỏi của người dùng
+        conversation_history : List[Dict[str, Any]], optional
+            Lịch sử hội thoại
+        system_prompt : str, optional
+            System prompt
+        provider_name : str, optional
+            Tên provider, nếu None sẽ dùng default
+
+        Yields:
+        -------
+        str
+            Các đoạn text ngay khi provider sinh ra
+
+        Raises:
+        -------
+        CircuitOpenError
+            Nếu breaker của provider đang mở
+        """
+        messages = self._build_chat_messages(query, conversation_history, system_prompt)
+
+        name = provider_name or self.default_provider
+        breaker = self._breakers[name]
+
+        if not breaker.allow():
+            raise CircuitOpenError(f"LLM provider '{name}' circuit is open")
+
+        provider = self.get_provider(name)
+        try:
+            async for chunk in provider.generate_stream(messages):
+                yield chunk
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        breaker.record_success()
+
     async def generate_structured_response(
         self,
         prompt: str,
         output_schema: Dict[str, Any],
-        provider_name: Optional[str] = None
+        provider_name: Optional[str] = None,
+        cacheable: bool = False
     ) -> Dict[str, Any]:
         """
         Generate structured response (JSON) theo schema.
@@ -465,6 +774,8 @@ class LLMOrchestrator:
             JSON schema for the output
         provider_name : str, optional
             Tên provider, nếu None sẽ dùng default
+        cacheable : bool
+            Cho phép cache response theo hash của messages
             
         Returns:
         --------
@@ -489,13 +800,25 @@ class LLMOrchestrator:
             }
         ]
         
+        # Check response cache
+        cache_key = None
+        if cacheable:
+            cache_key = self._response_cache_key(provider_name, "generate_json", messages)
+            cached = await self._get_cached_response(cache_key)
+            if cached is not None:
+                logger.info("LLM structured response cache hit")
+                return orjson.loads(cached)
+
         # Generate JSON response
         try:
             start_time = time.time()
-            response = await provider.generate_json(messages)
+            response = await self._call_provider(provider_name, "generate_json", messages)
             duration = time.time() - start_time
             
             logger.info(f"Generated structured response in {duration:.2f}s using {provider_name or self.default_provider}")
+
+            if cache_key is not None:
+                await self._cache_response(cache_key, orjson.dumps(response))
             
             return response
             
@@ -507,20 +830,8 @@ class LLMOrchestrator:
                 logger.info(f"Falling back to default provider {self.default_provider}")
                 return await self.generate_structured_response(prompt, output_schema)
             
-            # If all fails, return minimal valid structure
-            minimal_response = {"error": "Could not generate structured response"}
-            for key, val in output_schema.get("properties", {}).items():
-                if key in output_schema.get("required", []):
-                    if val.get("type") == "string":
-                        minimal_response[key] = ""
-                    elif val.get("type") == "array":
-                        minimal_response[key] = []
-                    elif val.get("type") == "object":
-                        minimal_response[key] = {}
-                    else:
-                        minimal_response[key] = None
-            
-            return minimal_response
+            # If all fails, return minimal valid structure (precomputed per schema)
+            return _copy_fallback(_minimal_fallback(orjson.dumps(output_schema)))
     
     async def generate_support_response(
         self,
@@ -557,4 +868,5 @@ class LLMOrchestrator:
             support_data = json.dumps(support_info, ensure_ascii=False)
             prompt = f"Người dùng hỏi: {query}\n\nThông tin hỗ trợ: {support_data}\n\nHãy trả lời dựa trên thông tin trên."
         
-        return await self.generate_response(prompt, system_prompt=system_prompt, provider_name=provider_name)
\ No newline at end of file
+        return await self.generate_response(prompt, system_prompt=system_prompt,
+                                            provider_name=provider_name, cacheable=True)
\ No newline at end of file
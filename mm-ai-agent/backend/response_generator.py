@@ -9,21 +9,48 @@ của AI Agent gửi lại cho người dùng, bao gồm định dạng kết qu
 thông tin đơn hàng, v.v.
 """
 
+from dataclasses import dataclass
 from typing import Dict, Any, List, Optional
 
-from pydantic import BaseModel
-
 from utils.logging import setup_logger
 
 # Setup logging
 logger = setup_logger("response_generator")
 
 
-class AgentResponse(BaseModel):
-    """Model cho response từ AI Agent."""
+@dataclass(slots=True)
+class AgentResponse:
+    """
+    Model cho response từ AI Agent.
+
+    Dataclass với slots thay vì pydantic BaseModel: nội dung do chính
+    hệ thống sinh ra nên không cần validate lại, khởi tạo chỉ còn gán
+    attribute trực tiếp trên hot path.
+    """
     message: str
-    data: Optional[Dict[str, Any]] = None
     type: str  # 'text', 'product', 'order', etc.
+    data: Optional[Dict[str, Any]] = None
+
+
+# Template message đơn hàng, build một lần ở module scope; format_map
+# một phát thay vì ghép chuỗi nhiều bước trong mỗi lần format
+_ORDER_TMPL = "Đơn hàng #{order_id} đang trong trạng thái {status_vi}.{delivery}"
+
+# Số gợi ý sản phẩm tối đa trong một response
+_MAX_SUGGESTIONS = 10
+
+# Map trạng thái đơn hàng sang tiếng Việt; build một lần ở import thay
+# vì dựng lại dict trong mỗi lần format
+_STATUS_MAP_VI: Dict[str, str] = {
+    "processing": "đang xử lý",
+    "pending": "chờ xác nhận",
+    "pending_payment": "chờ thanh toán",
+    "on_hold": "tạm giữ",
+    "completed": "đã hoàn thành",
+    "shipped": "đang giao hàng",
+    "canceled": "đã hủy",
+    "refunded": "đã hoàn tiền"
+}
 
 
 class ResponseGenerator:
@@ -35,7 +62,10 @@ class ResponseGenerator:
     2. Định dạng thông tin đơn hàng
     3. Tạo câu trả lời dựa trên context
     """
-    
+
+    # Class không giữ state per-instance; slots rỗng bỏ hẳn __dict__
+    __slots__ = ()
+
     def __init__(self):
         """Khởi tạo Response Generator."""
         logger.info("Response Generator initialized")
@@ -60,57 +90,73 @@ class ResponseGenerator:
         AgentResponse
             Response đã được định dạng
         """
-        # Initialize response data
-        formatted_data = {
-            "keywords": keywords,
-            "results": {}
-        }
-        
+        # Fast path: mọi keyword đều lỗi (vd. Magento down) — trả response
+        # tối thiểu, không cần extract hay đếm sản phẩm từng keyword
+        if all("error" in result for result in products.values()):
+            return AgentResponse(
+                message="Xin lỗi, có lỗi khi tìm kiếm sản phẩm. Vui lòng thử lại sau.",
+                data={
+                    "keywords": keywords,
+                    "results": {
+                        keyword: {"error": result["error"], "products": []}
+                        for keyword, result in products.items()
+                    }
+                },
+                type="product"
+            )
+
+        results = {}
         all_products_count = 0
-        error_count = 0
-        
-        # Process each keyword result
+
+        # Process each keyword result: mỗi payload chỉ duyệt một lần,
+        # không lặp lại chuỗi .get() lồng nhau cho từng field
         for keyword, result in products.items():
             if "error" in result:
-                formatted_data["results"][keyword] = {
+                results[keyword] = {
                     "error": result["error"],
                     "products": []
                 }
-                error_count += 1
-            else:
-                # Extract product data
-                try:
-                    product_items = result.get("data", {}).get("products", {}).get("items", [])
-                    total_count = result.get("data", {}).get("products", {}).get("total_count", 0)
-                    
-                    formatted_data["results"][keyword] = {
-                        "total_count": total_count,
-                        "products": product_items
-                    }
-                    
-                    all_products_count += total_count
-                except Exception as e:
-                    logger.error(f"Error formatting products for {keyword}: {e}")
-                    formatted_data["results"][keyword] = {
-                        "error": f"Data formatting error: {str(e)}",
-                        "products": []
-                    }
-                    error_count += 1
-        
-        # Generate response message
+                continue
+
+            product_items, total_count = self._extract_products(result)
+            results[keyword] = {
+                "total_count": total_count,
+                "products": product_items
+            }
+            all_products_count += total_count
+
+        formatted_data = {
+            "keywords": keywords,
+            "results": results
+        }
+
+        # Generate response message (trường hợp toàn lỗi đã return ở trên)
         if all_products_count > 0:
             message = f"Tìm thấy {all_products_count} sản phẩm liên quan đến từ khóa: {', '.join(keywords)}"
-        elif error_count == len(keywords):
-            message = "Xin lỗi, có lỗi khi tìm kiếm sản phẩm. Vui lòng thử lại sau."
         else:
             message = f"Không tìm thấy sản phẩm nào cho từ khóa: {', '.join(keywords)}"
-        
+
         return AgentResponse(
             message=message,
             data=formatted_data,
             type="product"
         )
     
+    @staticmethod
+    def _extract_products(result: Dict[str, Any]) -> tuple:
+        """
+        Lấy (items, total_count) từ một payload GraphQL product search.
+
+        Mỗi tầng chỉ lookup một lần; tầng nào thiếu thì trả kết quả rỗng
+        thay vì raise.
+        """
+        data = result.get("data")
+        product_data = data.get("products") if data else None
+        if not product_data:
+            return [], 0
+
+        return product_data.get("items", []), product_data.get("total_count", 0)
+
     def format_order_response(self, order_info: Dict[str, Any]) -> AgentResponse:
         """
         Định dạng thông tin đơn hàng.
@@ -136,26 +182,20 @@ class ResponseGenerator:
         status = order_info.get("status", "N/A")
         
         # Format status message for Vietnamese
-        status_map = {
-            "processing": "đang xử lý",
-            "pending": "chờ xác nhận",
-            "pending_payment": "chờ thanh toán",
-            "on_hold": "tạm giữ",
-            "completed": "đã hoàn thành",
-            "shipped": "đang giao hàng",
-            "canceled": "đã hủy",
-            "refunded": "đã hoàn tiền"
-        }
-        
-        status_vi = status_map.get(status.lower(), status)
-        
-        # Generate message
-        message = f"Đơn hàng #{order_id} đang trong trạng thái {status_vi}."
-        
-        # Add estimated delivery if available
-        if "estimated_delivery" in order_info:
-            message += f" Dự kiến giao hàng vào ngày {order_info['estimated_delivery']}."
-        
+        status_vi = _STATUS_MAP_VI.get(status.lower(), status)
+
+        # Generate message: một lần format_map trên template module-level
+        if (delivery_date := order_info.get("estimated_delivery")):
+            delivery = f" Dự kiến giao hàng vào ngày {delivery_date}."
+        else:
+            delivery = ""
+
+        message = _ORDER_TMPL.format_map({
+            "order_id": order_id,
+            "status_vi": status_vi,
+            "delivery": delivery
+        })
+
         return AgentResponse(
             message=message,
             data=order_info,
@@ -189,29 +229,32 @@ class ResponseGenerator:
             )
         
         # Extract basic customer details
-        customer_name = customer_info.get("firstname", "") + " " + customer_info.get("lastname", "")
+        customer_name = f"{customer_info.get('firstname', '')} {customer_info.get('lastname', '')}"
         customer_email = customer_info.get("email", "N/A")
-        
+
         # Generate message
         message = f"Xin chào {customer_name}! "
-        
+
+        # Mỗi subdict của cdp_info chỉ lookup một lần thay vì lặp lại
+        # chuỗi "cdp_info and key in cdp_info" cho từng field
+        cdp = cdp_info or {}
+
         # Add loyalty info if available
-        if cdp_info and "loyalty" in cdp_info:
-            loyalty = cdp_info["loyalty"]
+        if (loyalty := cdp.get("loyalty")):
             tier = loyalty.get("tier", "")
             points = loyalty.get("points", 0)
-            
+
             if tier and points:
                 message += f"Bạn đang ở hạng {tier} với {points} điểm tích lũy. "
-        
+
         # Add purchase history if available
-        if cdp_info and "purchase_history" in cdp_info:
-            purchase_count = cdp_info["purchase_history"].get("total_orders", 0)
+        if (purchase_history := cdp.get("purchase_history")):
+            purchase_count = purchase_history.get("total_orders", 0)
             if purchase_count > 0:
                 message += f"Bạn đã thực hiện {purchase_count} đơn hàng với Mega Market. "
-        
+
         # Add recommendations if available
-        if cdp_info and "recommendations" in cdp_info and cdp_info["recommendations"]:
+        if cdp.get("recommendations"):
             message += "Dựa trên lịch sử mua hàng, chúng tôi có một số đề xuất sản phẩm dành cho bạn."
         
         # Combine data
@@ -228,7 +271,8 @@ class ResponseGenerator:
             type="customer_profile"
         )
     
-    def format_search_suggestions(self, products: List[Dict[str, Any]]) -> AgentResponse:
+    @staticmethod
+    def format_search_suggestions(products: List[Dict[str, Any]]) -> AgentResponse:
         """
         Định dạng gợi ý tìm kiếm sản phẩm tương tự.
         
@@ -247,14 +291,18 @@ class ResponseGenerator:
                 message="Không có gợi ý sản phẩm nào.",
                 type="text"
             )
-        
+
         # Generate message with suggestions
         message = "Bạn có thể quan tâm đến các sản phẩm sau:"
-        
+
+        # Cap số gợi ý trả về: payload gọn và client cũng chỉ hiển thị
+        # được chừng đó
+        suggestions = products[:_MAX_SUGGESTIONS]
+
         # Prepare data
         formatted_data = {
-            "suggestions": products,
-            "total_count": len(products)
+            "suggestions": suggestions,
+            "total_count": len(suggestions)
         }
         
         return AgentResponse(
@@ -263,7 +311,8 @@ class ResponseGenerator:
             type="suggestion"
         )
     
-    def format_category_response(self, category_info: Dict[str, Any]) -> AgentResponse:
+    @staticmethod
+    def format_category_response(category_info: Dict[str, Any]) -> AgentResponse:
         """
         Định dạng thông tin danh mục sản phẩm.
         
@@ -306,7 +355,8 @@ class ResponseGenerator:
             type="category"
         )
     
-    def format_error_response(self, error_message: str) -> AgentResponse:
+    @staticmethod
+    def format_error_response(error_message: str) -> AgentResponse:
         """
         Định dạng thông báo lỗi.
         
@@ -325,7 +375,8 @@ class ResponseGenerator:
             type="error"
         )
     
-    def format_fallback_response(self) -> AgentResponse:
+    @staticmethod
+    def format_fallback_response() -> AgentResponse:
         """
         Định dạng phản hồi dự phòng.
         
@@ -11,22 +11,25 @@ Module này quản lý tất cả các công cụ tương tác với dịch vụ
 """
 
 import os
-import json
 import asyncio
 import aiohttp
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Union
 
+import orjson
 import redis.asyncio as redis
+from cachetools import LRUCache, TTLCache
 
 from utils.logging import setup_logger
-from config import ToolsConfig, CacheConfig
+from utils.redis_pool import get_pool
+from config import get_tools_config, get_cache_config
 
 # Setup logging
 logger = setup_logger("tool_manager")
 
 # Load configuration
-tools_config = ToolsConfig()
-cache_config = CacheConfig()
+tools_config = get_tools_config()
+cache_config = get_cache_config()
 
 
 class ToolManager:
@@ -38,15 +41,25 @@ class ToolManager:
     2. Kiểm tra thông tin đơn hàng
     3. Truy vấn thông tin khách hàng
     """
-    
+
+    __slots__ = (
+        "redis", "search_api_url", "order_api_url", "customer_api_url",
+        "cdp_api_url", "headers", "_session", "_l1", "_l1_locks",
+        "_cache_writes", "_writer_task", "_user_headers"
+    )
+
+    # Số cache write tối đa gom vào một pipeline flush
+    _CACHE_WRITE_BATCH = 64
+
     def __init__(self):
         """Khởi tạo Tool Manager và kết nối Redis cache."""
-        # Setup Redis connection
+        # Setup Redis connection (pool dùng chung toàn process). Giữ
+        # response dạng bytes: orjson nhận bytes trực tiếp nên decode
+        # UTF-8 từng blob 10-50 KB trong Python là việc thừa
         self.redis = redis.Redis(
-            host=cache_config.REDIS_HOST,
-            port=cache_config.REDIS_PORT,
-            db=cache_config.REDIS_TOOL_DB,
-            decode_responses=True
+            connection_pool=get_pool(
+                cache_config.REDIS_TOOL_DB, decode_responses=False
+            )
         )
         
         # Setup API configurations
@@ -61,9 +74,173 @@ class ToolManager:
             "Store": tools_config.STORE_CODE,
             "Authorization": f"Bearer {tools_config.API_TOKEN}"
         }
+
+        # HTTP session dùng chung cả process: keep-alive + connection pool,
+        # không trả giá TCP/TLS handshake cho từng request (tạo lazy vì
+        # cần event loop đang chạy)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # L1 cache trong process trước Redis: hot key trả về thẳng từ bộ
+        # nhớ, không tốn round-trip + parse JSON cho mỗi hit. TTL ngắn để
+        # không giữ dữ liệu cũ hơn đáng kể so với Redis
+        self._l1: TTLCache = TTLCache(maxsize=1024, ttl=60)
+        # Lock theo key chống thundering herd khi nhiều request cùng miss
+        self._l1_locks: Dict[str, asyncio.Lock] = {}
+
+        # Write-behind queue: cache write không chặn response path, được
+        # background task gom batch và flush bằng pipeline (task tạo lazy
+        # vì cần event loop đang chạy)
+        self._cache_writes: asyncio.Queue = asyncio.Queue(maxsize=1024)
+        self._writer_task: Optional[asyncio.Task] = None
+
+        # Header dict theo user, build một lần và dùng lại (aiohttp không
+        # mutate headers nên share an toàn); LRU giữ các user đang active
+        self._user_headers: LRUCache = LRUCache(maxsize=512)
         
         logger.info("Tool Manager initialized")
-    
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Lấy (hoặc tạo) HTTP session dùng chung.
+
+        Returns:
+        --------
+        aiohttp.ClientSession
+            Session với connection pool và keep-alive
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+
+        return self._session
+
+    async def close(self) -> None:
+        """Đóng HTTP session dùng chung (gọi khi app shutdown)."""
+        if self._writer_task is not None and not self._writer_task.done():
+            self._writer_task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _headers_for(self, user_id: Optional[str]) -> Dict[str, str]:
+        """
+        Lấy header dict có Customer-ID cho một user (cache theo user_id).
+
+        Parameters:
+        -----------
+        user_id : str, optional
+            ID của người dùng; None thì trả headers mặc định
+
+        Returns:
+        --------
+        Dict[str, str]
+            Header dict dùng chung, không được mutate
+        """
+        if not user_id:
+            return self.headers
+
+        headers = self._user_headers.get(user_id)
+        if headers is None:
+            headers = {**self.headers, "Customer-ID": user_id}
+            self._user_headers[user_id] = headers
+
+        return headers
+
+    def _queue_cache_write(self, key: str, value: bytes, ttl: int) -> None:
+        """
+        Đẩy một cache write vào queue write-behind (không chặn caller).
+
+        Queue đầy thì bỏ write cũ nhất: mất một cache entry chỉ gây thêm
+        một lần fetch lại, không ảnh hưởng tính đúng.
+        """
+        try:
+            self._cache_writes.put_nowait((key, value, ttl))
+        except asyncio.QueueFull:
+            try:
+                self._cache_writes.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            logger.warning(f"Cache write queue full, dropped oldest entry for {key}")
+            self._cache_writes.put_nowait((key, value, ttl))
+
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.get_running_loop().create_task(
+                self._drain_cache_writes()
+            )
+
+    async def _drain_cache_writes(self) -> None:
+        """Background task gom cache write thành batch và flush qua pipeline."""
+        while True:
+            item = await self._cache_writes.get()
+            pipe = self.redis.pipeline(transaction=False)
+            key, value, ttl = item
+            pipe.set(key, value, ex=ttl)
+
+            # Gom thêm những write đang chờ sẵn, tối đa một batch
+            while len(pipe.command_stack) < self._CACHE_WRITE_BATCH:
+                try:
+                    key, value, ttl = self._cache_writes.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                pipe.set(key, value, ex=ttl)
+
+            try:
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Cache write batch failed: {e}")
+
+    async def _cached_get(self, cache_key: str, fetcher, ttl: int) -> Dict[str, Any]:
+        """
+        Lookup hai tầng L1 (in-process) -> Redis -> fetcher.
+
+        Parameters:
+        -----------
+        cache_key : str
+            Key dùng chung cho cả L1 và Redis
+        fetcher : Callable[[], Awaitable[Dict[str, Any]]]
+            Coroutine factory gọi API nguồn khi cả hai tầng cache miss
+        ttl : int
+            TTL (giây) khi ghi kết quả mới vào Redis
+
+        Returns:
+        --------
+        Dict[str, Any]
+            Kết quả từ cache hoặc fetcher (kết quả lỗi không được cache)
+        """
+        value = self._l1.get(cache_key)
+        if value is not None:
+            return value
+
+        # Lock theo key: các request miss đồng thời chờ một fetch duy nhất
+        lock = self._l1_locks.setdefault(cache_key, asyncio.Lock())
+        try:
+            async with lock:
+                value = self._l1.get(cache_key)
+                if value is not None:
+                    return value
+
+                cached = await self.redis.get(cache_key)
+                if cached:
+                    logger.info(f"Cache hit for key: {cache_key}")
+                    value = orjson.loads(cached)
+                    self._l1[cache_key] = value
+                    return value
+
+                value = await fetcher()
+                if "error" not in value:
+                    self._l1[cache_key] = value
+                    self._queue_cache_write(cache_key, orjson.dumps(value), ttl)
+                return value
+        finally:
+            self._l1_locks.pop(cache_key, None)
+
+
     async def search_products(self, keywords: List[str]) -> Dict[str, Any]:
         """
         Tìm kiếm sản phẩm dựa trên từ khóa.
@@ -79,85 +256,105 @@ class ToolManager:
             Kết quả tìm kiếm sản phẩm
         """
         results = {}
-        
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for keyword in keywords:
-                # Check cache first
-                cache_key = f"product:{keyword}"
-                cached = await self.redis.get(cache_key)
-                
-                if cached:
-                    logger.info(f"Product search cache hit for keyword: {keyword}")
-                    results[keyword] = json.loads(cached)
+
+        # L1 trước: keyword hot trả về ngay từ bộ nhớ process
+        l1_misses = []
+        for keyword in keywords:
+            value = self._l1.get(f"product:{keyword}")
+            if value is not None:
+                results[keyword] = value
+            else:
+                l1_misses.append(keyword)
+
+        if not l1_misses:
+            return results
+
+        # Check Redis bằng một MGET duy nhất: 1 round-trip cho cả danh
+        # sách keyword miss thay vì N GET tuần tự
+        cached_values = await self.redis.mget(
+            [f"product:{keyword}" for keyword in l1_misses]
+        )
+
+        uncached = []
+        for keyword, cached in zip(l1_misses, cached_values):
+            if cached:
+                logger.info(f"Product search cache hit for keyword: {keyword}")
+                value = orjson.loads(cached)
+                self._l1[f"product:{keyword}"] = value
+                results[keyword] = value
+            else:
+                uncached.append(keyword)
+
+        # Một document GraphQL multi-alias cho tất cả keyword miss:
+        # 1 round-trip + 1 lần parse phía Magento thay vì N
+        if uncached:
+            fetched = await self._fetch_products_batch(uncached)
+
+            # Ghi cache qua queue write-behind: response trả về ngay,
+            # background task gom batch và flush
+            for keyword, result in fetched.items():
+                if "error" in result:
+                    logger.error(f"Error searching for keyword {keyword}: {result['error']}")
                 else:
-                    # Create search task
-                    task = self._fetch_product_data(session, keyword)
-                    tasks.append(task)
-            
-            # Execute all search tasks concurrently
-            if tasks:
-                task_results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for keyword, result in task_results:
-                    if isinstance(result, Exception):
-                        logger.error(f"Error searching for keyword {keyword}: {result}")
-                        results[keyword] = {"error": str(result)}
-                    else:
-                        # Cache the result
-                        await self.redis.set(
-                            f"product:{keyword}", 
-                            json.dumps(result), 
-                            ex=cache_config.PRODUCT_CACHE_TTL
-                        )
-                        results[keyword] = result
-        
+                    self._l1[f"product:{keyword}"] = result
+                    self._queue_cache_write(
+                        f"product:{keyword}",
+                        orjson.dumps(result),
+                        cache_config.PRODUCT_CACHE_TTL
+                    )
+                results[keyword] = result
+
         return results
     
-    async def _fetch_product_data(self, session: aiohttp.ClientSession, keyword: str) -> tuple:
+    # Field selection dùng chung cho mọi alias trong product search query
+    _PRODUCT_FIELDS = (
+        "items { id sku name url_key "
+        "price_range { minimum_price { regular_price { value currency } } } "
+        "small_image { url } } total_count"
+    )
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _build_batch_query(n: int) -> str:
         """
-        Fetch product data từ Magento API.
-        
+        Build (và cache) document GraphQL multi-alias cho n keyword.
+
+        Keyword được truyền qua GraphQL variables thay vì nội suy vào
+        document: cùng một document cho mọi batch n keyword nên Magento
+        cache được AST/validation, và loại luôn khả năng injection qua
+        ký tự đặc biệt trong search term.
+        """
+        vars_decl = ", ".join(f"$s{i}: String!" for i in range(n))
+        parts = " ".join(
+            f"k{i}: products(search: $s{i}, sort: {{ relevance: DESC }}) "
+            f"{{ {ToolManager._PRODUCT_FIELDS} }}"
+            for i in range(n)
+        )
+        return f"query ProductSearch({vars_decl}) {{ {parts} }}"
+
+    async def _fetch_products_batch(self, keywords: List[str]) -> Dict[str, Any]:
+        """
+        Fetch product data cho nhiều keyword trong một GraphQL request.
+
         Parameters:
         -----------
-        session : aiohttp.ClientSession
-            Session HTTP
-        keyword : str
-            Từ khóa tìm kiếm
-            
+        keywords : List[str]
+            Các từ khóa cần query (chưa có trong cache)
+
         Returns:
         --------
-        tuple
-            (keyword, result)
+        Dict[str, Any]
+            Map keyword -> GraphQL payload (shape như query đơn lẻ cũ)
         """
+        # Alias k0..kN, mỗi alias một search term (truyền qua variables)
+        alias_map = {f"k{i}": keyword for i, keyword in enumerate(keywords)}
+        query = {
+            "query": self._build_batch_query(len(keywords)),
+            "variables": {f"s{i}": keyword for i, keyword in enumerate(keywords)}
+        }
+
         try:
-            # Prepare GraphQL query
-            query = {
-                "query": f"""
-                query ProductSearch {{
-                    products(search: "{keyword}", sort: {{ relevance: DESC }}) {{
-                        items {{
-                            id
-                            sku
-                            name
-                            url_key
-                            price_range {{
-                                minimum_price {{
-                                    regular_price {{
-                                        value
-                                        currency
-                                    }}
-                                }}
-                            }}
-                            small_image {{
-                                url
-                            }}
-                        }}
-                        total_count
-                    }}
-                }}"""
-            }
-            
+            session = self._get_session()
             async with session.post(
                 self.search_api_url, 
                 headers=self.headers, 
@@ -165,21 +362,30 @@ class ToolManager:
                 timeout=10
             ) as response:
                 if response.status == 200:
-                    result = await response.json()
-                    logger.info(f"Successfully fetched data for keyword: {keyword}")
-                    return keyword, result
+                    payload = await response.json()
+                    data = payload.get("data") or {}
+
+                    # Tách response theo alias về shape per-keyword cũ
+                    logger.info(f"Successfully fetched data for {len(keywords)} keywords")
+                    return {
+                        keyword: {"data": {"products": data.get(alias)}}
+                        for alias, keyword in alias_map.items()
+                    }
                 else:
                     error_text = await response.text()
                     logger.error(f"API error: {response.status}, {error_text}")
-                    return keyword, {"error": f"API error: {response.status}"}
+                    return {
+                        keyword: {"error": f"API error: {response.status}"}
+                        for keyword in keywords
+                    }
                     
         except asyncio.TimeoutError:
-            logger.error(f"Timeout while searching for keyword: {keyword}")
-            return keyword, {"error": "Request timeout"}
+            logger.error(f"Timeout while searching for keywords: {keywords}")
+            return {keyword: {"error": "Request timeout"} for keyword in keywords}
             
         except Exception as e:
-            logger.error(f"Request error for keyword {keyword}: {e}")
-            return keyword, {"error": str(e)}
+            logger.error(f"Request error for keywords {keywords}: {e}")
+            return {keyword: {"error": str(e)} for keyword in keywords}
     
     async def get_order_info(self, order_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -197,44 +403,33 @@ class ToolManager:
         Dict[str, Any]
             Thông tin đơn hàng
         """
-        # Check cache first
-        cache_key = f"order:{order_id}"
-        cached = await self.redis.get(cache_key)
-        
-        if cached:
-            logger.info(f"Order cache hit for order_id: {order_id}")
-            return json.loads(cached)
-        
+        return await self._cached_get(
+            f"order:{order_id}",
+            lambda: self._fetch_order_info(order_id, user_id),
+            cache_config.ORDER_CACHE_TTL
+        )
+
+    async def _fetch_order_info(
+        self, order_id: str, user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Gọi Order API lấy thông tin đơn hàng (không qua cache)."""
         try:
-            # Prepare headers with authentication
-            headers = self.headers.copy()
-            if user_id:
-                headers["Customer-ID"] = user_id
-            
             # Fetch order data
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.order_api_url}/{order_id}", 
-                    headers=headers,
-                    timeout=10
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        
-                        # Cache the result
-                        await self.redis.set(
-                            cache_key, 
-                            json.dumps(result), 
-                            ex=cache_config.ORDER_CACHE_TTL
-                        )
-                        
-                        logger.info(f"Successfully fetched order info for order_id: {order_id}")
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Order API error: {response.status}, {error_text}")
-                        return {"error": f"API error: {response.status}"}
-                        
+            session = self._get_session()
+            async with session.get(
+                f"{self.order_api_url}/{order_id}",
+                headers=self._headers_for(user_id),
+                timeout=10
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    logger.info(f"Successfully fetched order info for order_id: {order_id}")
+                    return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Order API error: {response.status}, {error_text}")
+                    return {"error": f"API error: {response.status}"}
+                    
         except asyncio.TimeoutError:
             logger.error(f"Timeout while fetching order info: {order_id}")
             return {"error": "Request timeout"}
@@ -257,39 +452,31 @@ class ToolManager:
         Dict[str, Any]
             Thông tin khách hàng
         """
-        # Check cache first
-        cache_key = f"customer:{user_id}"
-        cached = await self.redis.get(cache_key)
-        
-        if cached:
-            logger.info(f"Customer cache hit for user_id: {user_id}")
-            return json.loads(cached)
-        
+        return await self._cached_get(
+            f"customer:{user_id}",
+            lambda: self._fetch_customer_info(user_id),
+            cache_config.CUSTOMER_CACHE_TTL
+        )
+
+    async def _fetch_customer_info(self, user_id: str) -> Dict[str, Any]:
+        """Gọi Magento Customer API lấy thông tin khách hàng (không qua cache)."""
         try:
             # Fetch customer data
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.customer_api_url}/{user_id}", 
-                    headers=self.headers,
-                    timeout=10
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        
-                        # Cache the result
-                        await self.redis.set(
-                            cache_key, 
-                            json.dumps(result), 
-                            ex=cache_config.CUSTOMER_CACHE_TTL
-                        )
-                        
-                        logger.info(f"Successfully fetched customer info for user_id: {user_id}")
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Customer API error: {response.status}, {error_text}")
-                        return {"error": f"API error: {response.status}"}
-                        
+            session = self._get_session()
+            async with session.get(
+                f"{self.customer_api_url}/{user_id}",
+                headers=self.headers,
+                timeout=10
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    logger.info(f"Successfully fetched customer info for user_id: {user_id}")
+                    return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Customer API error: {response.status}, {error_text}")
+                    return {"error": f"API error: {response.status}"}
+                    
         except asyncio.TimeoutError:
             logger.error(f"Timeout while fetching customer info: {user_id}")
             return {"error": "Request timeout"}
@@ -312,42 +499,34 @@ class ToolManager:
         Dict[str, Any]
             Thông tin khách hàng từ CDP
         """
-        # Check cache first
-        cache_key = f"cdp:{user_id}"
-        cached = await self.redis.get(cache_key)
-        
-        if cached:
-            logger.info(f"CDP cache hit for user_id: {user_id}")
-            return json.loads(cached)
-        
+        return await self._cached_get(
+            f"cdp:{user_id}",
+            lambda: self._fetch_cdp_info(user_id),
+            cache_config.CDP_CACHE_TTL
+        )
+
+    async def _fetch_cdp_info(self, user_id: str) -> Dict[str, Any]:
+        """Gọi CDP Platform lấy profile khách hàng (không qua cache)."""
         try:
             # Fetch CDP data
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.cdp_api_url}/customers/{user_id}/profile", 
-                    headers={
-                        "Content-Type": "application/json",
-                        "x-api-key": tools_config.CDP_API_KEY
-                    },
-                    timeout=10
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        
-                        # Cache the result
-                        await self.redis.set(
-                            cache_key, 
-                            json.dumps(result), 
-                            ex=cache_config.CDP_CACHE_TTL
-                        )
-                        
-                        logger.info(f"Successfully fetched CDP info for user_id: {user_id}")
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"CDP API error: {response.status}, {error_text}")
-                        return {"error": f"API error: {response.status}"}
-                        
+            session = self._get_session()
+            async with session.get(
+                f"{self.cdp_api_url}/customers/{user_id}/profile",
+                headers={
+                    "Content-Type": "application/json",
+                    "x-api-key": tools_config.CDP_API_KEY
+                },
+                timeout=10
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    logger.info(f"Successfully fetched CDP info for user_id: {user_id}")
+                    return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"CDP API error: {response.status}, {error_text}")
+                    return {"error": f"API error: {response.status}"}
+                    
         except asyncio.TimeoutError:
             logger.error(f"Timeout while fetching CDP info: {user_id}")
             return {"error": "Request timeout"}
@@ -355,7 +534,38 @@ class ToolManager:
         except Exception as e:
             logger.error(f"Request error for CDP profile {user_id}: {e}")
             return {"error": str(e)}
-    
+
+    async def get_customer_profile(self, user_id: str) -> tuple:
+        """
+        Lấy song song thông tin khách hàng Magento và profile CDP.
+
+        Hai nguồn độc lập nên gather chạy đồng thời: wall-time còn
+        max(t_magento, t_cdp) thay vì tổng hai lần gọi tuần tự.
+
+        Parameters:
+        -----------
+        user_id : str
+            ID của người dùng
+
+        Returns:
+        --------
+        tuple
+            (customer_info, cdp_info) — mỗi phần là dict kết quả hoặc
+            dict lỗi dạng {"error": ...}
+        """
+        customer_info, cdp_info = await asyncio.gather(
+            self.get_customer_info(user_id),
+            self.get_cdp_info(user_id),
+            return_exceptions=True
+        )
+
+        if isinstance(customer_info, BaseException):
+            customer_info = {"error": str(customer_info)}
+        if isinstance(cdp_info, BaseException):
+            cdp_info = {"error": str(cdp_info)}
+
+        return customer_info, cdp_info
+
     async def create_order(self, user_id: str, order_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Tạo đơn hàng mới trong Magento.
@@ -373,28 +583,23 @@ class ToolManager:
             Kết quả tạo đơn hàng
         """
         try:
-            # Prepare headers with authentication
-            headers = self.headers.copy()
-            if user_id:
-                headers["Customer-ID"] = user_id
-                
             # Create order
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.order_api_url,
-                    headers=headers,
-                    json=order_data,
-                    timeout=15  # Order creation can take longer
-                ) as response:
-                    result = await response.json()
+            session = self._get_session()
+            async with session.post(
+                self.order_api_url,
+                headers=self._headers_for(user_id),
+                json=order_data,
+                timeout=aiohttp.ClientTimeout(total=15)  # Order creation can take longer
+            ) as response:
+                result = await response.json()
+                
+                if response.status in (200, 201):
+                    logger.info(f"Successfully created order for user_id: {user_id}")
+                    return result
+                else:
+                    logger.error(f"Order creation API error: {response.status}, {result}")
+                    return {"error": f"API error: {response.status}", "details": result}
                     
-                    if response.status in (200, 201):
-                        logger.info(f"Successfully created order for user_id: {user_id}")
-                        return result
-                    else:
-                        logger.error(f"Order creation API error: {response.status}, {result}")
-                        return {"error": f"API error: {response.status}", "details": result}
-                        
         except asyncio.TimeoutError:
             logger.error(f"Timeout while creating order for user_id: {user_id}")
             return {"error": "Request timeout"}
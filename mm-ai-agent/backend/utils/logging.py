@@ -10,42 +10,77 @@ cho phép ghi log có cấu trúc và dễ dàng tích hợp với các hệ th
 
 import os
 import logging
-import json
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional
 
+import orjson
+
+# Các attribute chuẩn của LogRecord, build một lần ở import; frozenset
+# membership rẻ hơn hẳn việc dựng lại set literal cho mỗi log record
+_LOGRECORD_STD_KEYS = frozenset({
+    "args", "asctime", "created", "exc_info", "exc_text", "filename",
+    "funcName", "id", "levelname", "levelno", "lineno", "module",
+    "msecs", "message", "msg", "name", "pathname", "process",
+    "processName", "relativeCreated", "stack_info", "thread", "threadName"
+})
+
+
+@lru_cache(maxsize=1)
+def _iso_second(seconds: int) -> str:
+    """Format phần giây của timestamp sang ISO (cache theo giây)."""
+    return datetime.utcfromtimestamp(seconds).isoformat()
+
+
+def _format_timestamp(created: float) -> str:
+    """
+    Format record.created thành chuỗi ISO-8601 UTC.
+
+    Các record trong cùng một giây dùng lại chuỗi đã format, chỉ phần
+    micro giây được tính lại — rẻ hơn nhiều so với dựng datetime mỗi record.
+    """
+    seconds = int(created)
+    micros = int((created - seconds) * 1_000_000)
+    return f"{_iso_second(seconds)}.{micros:06d}Z"
+
 
 class StructuredLogFormatter(logging.Formatter):
     """
     Formatter tạo ra JSON có cấu trúc cho mỗi log message.
-    Giúp dễ dàng phân tích và tìm kiếm log trong các hệ thống như 
+    Giúp dễ dàng phân tích và tìm kiếm log trong các hệ thống như
     ELK Stack, Google Cloud Logging, etc.
     """
-    
+
     def format(self, record):
         """Format log record thành JSON có cấu trúc."""
         log_data = {
-            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "timestamp": _format_timestamp(record.created),
             "level": record.levelname,
             "module": record.module,
             "message": record.getMessage(),
         }
-        
+
         # Add exception info if any
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
-        
+
         # Add any extra attributes
-        for key, value in record.__dict__.items():
-            if key not in {
-                "args", "asctime", "created", "exc_info", "exc_text", "filename",
-                "funcName", "id", "levelname", "levelno", "lineno", "module",
-                "msecs", "message", "msg", "name", "pathname", "process",
-                "processName", "relativeCreated", "stack_info", "thread", "threadName"
-            }:
-                log_data[key] = value
-        
-        return json.dumps(log_data)
+        extras = {
+            key: value
+            for key, value in record.__dict__.items()
+            if key not in _LOGRECORD_STD_KEYS
+        }
+        if extras:
+            log_data.update(extras)
+
+        # orjson nhanh hơn json thuần đáng kể; default=str để các extra
+        # không phải kiểu JSON chuẩn (vd. datetime) không làm vỡ log
+        return orjson.dumps(log_data, default=str).decode()
+
+
+# Formatter stateless nên dùng chung một instance cho mọi handler thay vì
+# tạo mới theo từng logger
+_FORMATTER = StructuredLogFormatter()
 
 
 def setup_logger(name: str) -> logging.Logger:
@@ -73,14 +108,14 @@ def setup_logger(name: str) -> logging.Logger:
     if not logger.handlers:
         # Console handler
         console_handler = logging.StreamHandler()
-        console_handler.setFormatter(StructuredLogFormatter())
+        console_handler.setFormatter(_FORMATTER)
         logger.addHandler(console_handler)
-        
+
         # File handler if LOG_FILE is specified
         log_file = os.getenv("LOG_FILE")
         if log_file:
             file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(StructuredLogFormatter())
+            file_handler.setFormatter(_FORMATTER)
             logger.addHandler(file_handler)
     
     return logger
@@ -102,32 +137,38 @@ def log_method_call(logger):
             # Extract method info
             class_name = args[0].__class__.__name__ if args else ""
             method_name = func.__name__
-            
+
+            # Gate bằng isEnabledFor: str() trên args/kwargs có thể tốn kém
+            # (payload nhiều KB) nên chỉ build extra khi DEBUG thực sự bật
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
             # Log method call
-            logger.debug(
-                f"Calling {class_name}.{method_name}",
-                extra={
-                    "class": class_name,
-                    "method": method_name,
-                    "args": str(args[1:]),  # Skip self
-                    "kwargs": str(kwargs)
-                }
-            )
-            
-            # Call the method
-            try:
-                result = func(*args, **kwargs)
-                
-                # Log success
+            if debug_enabled:
                 logger.debug(
-                    f"{class_name}.{method_name} completed successfully",
+                    f"Calling {class_name}.{method_name}",
                     extra={
                         "class": class_name,
                         "method": method_name,
-                        "result_type": type(result).__name__
+                        "args": str(args[1:]),  # Skip self
+                        "kwargs": str(kwargs)
                     }
                 )
-                
+
+            # Call the method
+            try:
+                result = func(*args, **kwargs)
+
+                # Log success
+                if debug_enabled:
+                    logger.debug(
+                        f"{class_name}.{method_name} completed successfully",
+                        extra={
+                            "class": class_name,
+                            "method": method_name,
+                            "result_type": type(result).__name__
+                        }
+                    )
+
                 return result
                 
             except Exception as e:
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Redis Connection Pool Utility cho Mega Market AI Agent.
+
+Module này cung cấp connection pool dùng chung cho toàn process. Mỗi
+component trước đây tự tạo client với pool riêng, nhân số socket lên
+theo số component; giờ các client cùng database chia sẻ một pool duy nhất.
+"""
+
+from typing import Dict, Tuple
+
+import redis.asyncio as redis
+
+from utils.logging import setup_logger
+from config import get_cache_config
+
+# Setup logging
+logger = setup_logger("redis_pool")
+
+# Load configuration
+cache_config = get_cache_config()
+
+# Pool được cache theo (db, decode_responses) — các client cùng cấu hình
+# dùng chung pool, TCP setup chỉ trả giá một lần cho mỗi connection.
+_pools: Dict[Tuple[int, bool], redis.ConnectionPool] = {}
+
+
+def get_pool(db: int, decode_responses: bool = True) -> redis.ConnectionPool:
+    """
+    Lấy (hoặc tạo) connection pool dùng chung cho một Redis database.
+
+    Parameters:
+    -----------
+    db : int
+        Redis database index
+    decode_responses : bool
+        Tự động decode response thành str (False cho cache binary)
+
+    Returns:
+    --------
+    redis.ConnectionPool
+        Pool dùng chung trong process
+    """
+    key = (db, decode_responses)
+    if key not in _pools:
+        _pools[key] = redis.ConnectionPool(
+            host=cache_config.REDIS_HOST,
+            port=cache_config.REDIS_PORT,
+            db=db,
+            password=cache_config.REDIS_PASSWORD or None,
+            decode_responses=decode_responses,
+            max_connections=cache_config.REDIS_MAX_CONNECTIONS
+        )
+        logger.info(f"Created shared Redis pool for db={db}")
+
+    return _pools[key]
+
+
+async def disconnect_pools() -> None:
+    """Đóng tất cả pool dùng chung (gọi khi app shutdown)."""
+    for pool in _pools.values():
+        await pool.disconnect()
+    _pools.clear()
+    logger.info("Disconnected all shared Redis pools")
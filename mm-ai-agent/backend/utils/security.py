@@ -9,27 +9,123 @@ bao gồm xác thực, mã hóa, và kiểm tra quyền truy cập.
 """
 
 import os
+import re
 import time
 import hmac
+import base64
 import hashlib
 import jwt
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 
+import orjson
+from cachetools import LRUCache, TTLCache
 from fastapi import Depends, HTTPException, Header, status
 from fastapi.security import APIKeyHeader
 
 from utils.logging import setup_logger
-from config import APIConfig
+from config import get_api_config
 
 # Setup logging
 logger = setup_logger("security")
 
 # Load configuration
-config = APIConfig()
+config = get_api_config()
 
 # API Key security scheme
 api_key_header = APIKeyHeader(name="X-Api-Key", auto_error=False)
 
+# Cache các JWT đã verify, keyed theo raw token: cùng một bearer token
+# được tái sử dụng hàng phút/giờ nên không cần chạy lại HMAC + base64 +
+# JSON parse mỗi request. Entry lưu (user, exp) và exp vẫn được kiểm tra
+# lại mỗi lần đọc nên token hết hạn không bao giờ được trả từ cache.
+_jwt_cache: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+
+# Hoist lên module scope: đọc config và check "không cấu hình key" một
+# lần lúc import thay vì trên từng request. Tuple để duyệt tuần tự theo
+# thứ tự cố định trong verify_api_key
+_API_KEY_HASHES = tuple(config.API_KEY_HASHES)
+_API_KEYS_DISABLED = not _API_KEY_HASHES
+
+# Secret HMAC đọc và encode một lần lúc import
+_HMAC_SECRET = os.environ.get("HMAC_SECRET", "megamarket_secret").encode()
+
+# Cache các lần verify HMAC thành công, keyed theo (blake2b(body), chữ
+# ký): webhook provider hay retry nguyên payload, lần sau chỉ còn một
+# lượt hash ngắn + dict lookup thay vì HMAC cả body. Không cache kết quả
+# âm — attacker có thể spam chữ ký sai để đẩy entry tốt ra khỏi cache
+_verify_cache: LRUCache = LRUCache(maxsize=1024)
+
+# Secret JWT đọc và encode một lần lúc import thay vì tra env mỗi request
+_JWT_SECRET = os.environ.get("JWT_SECRET_KEY", "secret").encode()
+
+# Chặn deploy production với secret mặc định — fail ngay lúc import thay
+# vì chạy âm thầm với token ký bằng "secret"
+if _JWT_SECRET == b"secret" and os.environ.get("ENV") == "production":
+    raise RuntimeError("JWT_SECRET_KEY must be set in production")
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    """Decode base64url, tự bù padding bị lược trong JWT."""
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _fast_decode_hs256(token: str) -> Dict[str, Any]:
+    """
+    Decode và verify JWT HS256 theo đường tắt, không qua PyJWT.
+
+    Deployment chỉ dùng HS256 nên bỏ được tầng dispatch thuật toán và
+    validate claim tổng quát của jwt.decode: tách token bằng rpartition,
+    HMAC-SHA256 một phát qua hmac.digest, compare_digest chữ ký, rồi
+    parse payload và check exp. Token alg:none hay thuật toán khác tự
+    fail ở bước so chữ ký. Lỗi raise các exception PyJWT quen thuộc để
+    caller xử lý như cũ.
+
+    Parameters:
+    -----------
+    token : str
+        JWT dạng compact (header.payload.signature)
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Payload đã verify (exp còn hạn, bắt buộc có)
+    """
+    token_b = token.encode("ascii")
+    signing_input, sep, sig_b64 = token_b.rpartition(b".")
+    if not sep or b"." not in signing_input:
+        raise jwt.InvalidTokenError("Malformed token")
+
+    expected = hmac.digest(_JWT_SECRET, signing_input, "sha256")
+    if not hmac.compare_digest(_b64url_decode(sig_b64), expected):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+
+    # orjson parse bytes trực tiếp, nhanh hơn json thuần cho payload nhỏ
+    payload = orjson.loads(_b64url_decode(signing_input.rpartition(b".")[2]))
+
+    exp = payload.get("exp")
+    if exp is None:
+        raise jwt.MissingRequiredClaimError("exp")
+    if exp < time.time():
+        raise jwt.ExpiredSignatureError("Token expired")
+
+    return payload
+
+# Danh sách cấm của sanitizer cấu hình được qua env: ký tự đơn đi vào
+# bảng translate (một lượt quét C-level), pattern nhiều ký tự gom vào một
+# regex alternation case-insensitive. Với quy mô vài pattern thì cả hai
+# đều linear theo input; bảng build một lần lúc import
+_SANITIZE_TRANS = str.maketrans(
+    "", "", os.environ.get("SANITIZE_BANNED_CHARS", "'\";\\")
+)
+_SCRIPT_RE = re.compile(
+    "|".join(
+        p for p in
+        os.environ.get("SANITIZE_BANNED_PATTERNS", "</?script>").split(",")
+        if p
+    ),
+    re.IGNORECASE
+)
+
 
 def verify_api_key(api_key: str) -> bool:
     """
@@ -45,12 +141,18 @@ def verify_api_key(api_key: str) -> bool:
     bool
         True nếu API key hợp lệ, False nếu không
     """
-    # If no API keys are configured, always return True
-    if not config.API_KEYS or config.API_KEYS == ['']:
+    if _API_KEYS_DISABLED:
         return True
-    
-    # Check if API key matches any of the configured keys
-    return api_key in config.API_KEYS
+
+    # So sánh digest SHA-256 của input với từng key hash đã cấu hình bằng
+    # compare_digest, duyệt hết danh sách kể cả khi đã match: thời gian
+    # không phụ thuộc key nào (nếu có) khớp, đóng timing side channel
+    digest = hashlib.sha256(api_key.encode()).digest()
+    matched = 0
+    for key_hash in _API_KEY_HASHES:
+        matched |= hmac.compare_digest(digest, key_hash)
+
+    return bool(matched)
 
 
 async def get_api_key_dependency(api_key: str = Depends(api_key_header)) -> str:
@@ -79,7 +181,9 @@ async def get_api_key_dependency(api_key: str = Depends(api_key_header)) -> str:
         )
     
     if not verify_api_key(api_key):
-        logger.warning(f"Invalid API key attempt: {api_key[:5]}...")
+        # %s lazy: logging chỉ format khi level cho phép, không dựng chuỗi
+        # trên failed-auth path mà attacker có thể spam
+        logger.warning("Invalid API key attempt: %s...", api_key[:5])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
@@ -108,75 +212,100 @@ async def get_current_user(
         return None
     
     try:
-        # Extract token from header
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
+        # Extract token from header: partition trả 3-tuple cố định, không
+        # cấp phát list như split() và không raise với header nhiều khoảng trắng
+        scheme, sep, token = authorization.partition(" ")
+        if not sep or not token or scheme.lower() != "bearer":
             return None
-        
-        # Decode token
-        decoded_token = jwt.decode(
-            token,
-            os.getenv("JWT_SECRET_KEY", "secret"),
-            algorithms=["HS256"]
-        )
-        
-        # Check if token is expired
-        if decoded_token["exp"] < time.time():
-            logger.warning("Expired JWT token")
-            return None
-        
-        return decoded_token["user"]
-        
-    except Exception as e:
-        logger.error(f"Error authenticating user: {str(e)}")
+
+        # Cache hit: chỉ cần check lại exp, không decode lại
+        cached = _jwt_cache.get(token)
+        if cached is not None:
+            user, exp = cached
+            if exp < time.time():
+                logger.warning("Expired JWT token")
+                del _jwt_cache[token]
+                return None
+            return user
+
+        # Decode token qua fast path HS256 (verify chữ ký + require exp)
+        decoded_token = _fast_decode_hs256(token)
+
+        # Chỉ cache token verify thành công
+        user = decoded_token["user"]
+        _jwt_cache[token] = (user, decoded_token["exp"])
+        return user
+
+    except (jwt.PyJWTError, ValueError, KeyError) as e:
+        # Token hỏng/giả là chuyện thường (kể cả bị spray) — log debug với
+        # %s lazy, không dựng chuỗi khi handler không bật; lỗi lạ propagate
+        logger.debug("Authentication failed: %s", e)
         return None
 
 
-def generate_hmac(data: str, secret: Optional[str] = None) -> str:
+def generate_hmac(data: Union[str, bytes], secret: Optional[str] = None) -> str:
     """
     Tạo HMAC cho một chuỗi dữ liệu.
-    
+
     Parameters:
     -----------
-    data : str
-        Dữ liệu cần tạo HMAC
+    data : str or bytes
+        Dữ liệu cần tạo HMAC; raw request body nên truyền thẳng dạng
+        bytes để khỏi tốn một lượt encode
     secret : str, optional
         Secret key
-        
+
     Returns:
     --------
     str
         HMAC dưới dạng hex string
     """
-    secret_key = secret or os.getenv("HMAC_SECRET", "megamarket_secret")
-    h = hmac.new(
-        secret_key.encode(),
-        data.encode(),
-        hashlib.sha256
-    )
-    return h.hexdigest()
+    data_b = data if isinstance(data, (bytes, bytearray)) else data.encode()
+
+    if secret is None:
+        # Fast path: hmac.digest là one-shot chạy thẳng trong C, không
+        # dựng HMAC object Python cho mỗi chữ ký
+        return hmac.digest(_HMAC_SECRET, data_b, "sha256").hex()
 
+    return hmac.new(secret.encode(), data_b, hashlib.sha256).hexdigest()
 
-def verify_hmac(data: str, signature: str, secret: Optional[str] = None) -> bool:
+
+def verify_hmac(
+    data: Union[str, bytes], signature: str, secret: Optional[str] = None
+) -> bool:
     """
     Xác thực HMAC cho một chuỗi dữ liệu.
-    
+
     Parameters:
     -----------
-    data : str
-        Dữ liệu cần kiểm tra
+    data : str or bytes
+        Dữ liệu cần kiểm tra (bytes được dùng trực tiếp, không encode lại)
     signature : str
         Chữ ký HMAC cần xác thực
     secret : str, optional
         Secret key
-        
+
     Returns:
     --------
     bool
         True nếu HMAC hợp lệ, False nếu không
     """
-    expected = generate_hmac(data, secret)
-    return hmac.compare_digest(expected, signature)
+    data_b = data if isinstance(data, (bytes, bytearray)) else data.encode()
+
+    # Chỉ memoize đường secret mặc định (secret tùy biến không vào cache)
+    cache_key = None
+    if secret is None:
+        cache_key = (
+            hashlib.blake2b(data_b, digest_size=16).digest(), signature
+        )
+        if _verify_cache.get(cache_key):
+            return True
+
+    valid = hmac.compare_digest(generate_hmac(data_b, secret), signature)
+    if valid and cache_key is not None:
+        _verify_cache[cache_key] = True
+
+    return valid
 
 
 def sanitize_input(text: str) -> str:
@@ -194,17 +323,4 @@ def sanitize_input(text: str) -> str:
         Input đã được làm sạch
     """
     # Basic sanitization - remove common injection patterns
-    replacements = {
-        "'": "",
-        '"': "",
-        ";": "",
-        "\\": "",
-        "<script>": "",
-        "</script>": ""
-    }
-    
-    result = text
-    for char, replacement in replacements.items():
-        result = result.replace(char, replacement)
-    
-    return result
\ No newline at end of file
+    return _SCRIPT_RE.sub("", text.translate(_SANITIZE_TRANS))
\ No newline at end of file
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test cho CircuitBreaker của LLM Orchestrator."""
+
+import llm_orchestrator
+from llm_orchestrator import CircuitBreaker
+
+
+def test_opens_after_fail_max():
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=30.0)
+    assert breaker.state == "closed"
+
+    for _ in range(3):
+        breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_after_timeout_and_close_on_success(monkeypatch):
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30.0)
+    now = 1000.0
+    monkeypatch.setattr(llm_orchestrator.time, "time", lambda: now)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now += 31.0
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failure_during_half_open_reopens(monkeypatch):
+    """Lỗi trong half-open phải mở lại breaker, không kẹt ở half-open."""
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30.0)
+    now = 1000.0
+    monkeypatch.setattr(llm_orchestrator.time, "time", lambda: now)
+
+    breaker.record_failure()
+    breaker.record_failure()
+
+    now += 31.0
+    assert breaker.state == "half-open"
+
+    # Call thử trong half-open tiếp tục thất bại
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    # Và mở lại được nhiều lần chừng nào provider còn lỗi
+    now += 31.0
+    assert breaker.state == "half-open"
+    breaker.record_failure()
+    assert breaker.state == "open"
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test cho batch flush cache write của KnowledgeManager."""
+
+import asyncio
+
+import pytest
+
+from knowledge_manager import KnowledgeManager
+
+
+@pytest.mark.asyncio
+async def test_flush_pending_writes_queues_all_commands(monkeypatch):
+    """Các write đã queue phải thực sự nằm trên pipeline khi flush."""
+    km = KnowledgeManager()
+
+    pipe = km.redis.pipeline(transaction=False)
+    flushed = []
+
+    async def fake_execute(raise_on_error=True):
+        # Chụp lại command stack tại thời điểm flush, không chạm Redis thật
+        flushed.extend(pipe.command_stack)
+        return [True] * len(pipe.command_stack)
+
+    monkeypatch.setattr(pipe, "execute", fake_execute)
+    monkeypatch.setattr(km.redis, "pipeline", lambda transaction=True: pipe)
+
+    km._queue_cache_write("k1", "v1", 60)
+    km._queue_cache_write("k2", "v2", 60)
+
+    # Nhường event loop cho flush task chạy xong
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert len(flushed) == 2
+    assert not km._pending_writes
+    assert not km._flush_scheduled